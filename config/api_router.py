@@ -1,7 +1,8 @@
 from django.conf import settings
+from django.urls import include, path
 from rest_framework.routers import DefaultRouter, SimpleRouter
 
-from fires_watch.fires.api.views import FiresViewSet
+from fires_watch.fires.api.views import FiresV2ViewSet, FiresViewSet, calculate_async
 from fires_watch.users.api.views import UserViewSet
 
 if settings.DEBUG:
@@ -12,5 +13,12 @@ else:
 router.register("users", UserViewSet)
 router.register("fires", FiresViewSet, basename="fires")
 
+# Version 2, which only differs for high-volume endpoints
+router_v2 = SimpleRouter()
+router_v2.register("fires", FiresV2ViewSet, basename="fires-v2")
+
 app_name = "api"
-urlpatterns = router.urls
+urlpatterns = router.urls + [
+    path("fires/calculate-async/", calculate_async, name="fires-calculate-async"),
+    path("v2/", include(router_v2.urls)),
+]
@@ -0,0 +1,30 @@
+"""
+ASGI config for FIRES.watch project.
+
+This module contains the ASGI application used by ASGI servers, like uvicorn
+running as gunicorn worker class:
+
+    gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker
+
+It exposes a module-level variable named ``application``, see the
+``ASGI_APPLICATION`` setting. Async views (like the async calculate view of
+the fires API) run on the event loop of the worker, sync views in a thread.
+
+"""
+
+import os
+import sys
+from pathlib import Path
+
+from django.core.asgi import get_asgi_application
+
+# This allows easy placement of apps within the interior
+# fires_watch directory.
+ROOT_DIR = Path(__file__).resolve(strict=True).parent.parent
+sys.path.append(str(ROOT_DIR / "fires_watch"))
+# We defer to a DJANGO_SETTINGS_MODULE already in the environment.
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.production")
+
+# This application object is used by any ASGI server configured to use this
+# file.
+application = get_asgi_application()
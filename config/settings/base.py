@@ -49,6 +49,8 @@ DATABASES["default"]["ATOMIC_REQUESTS"] = True
 ROOT_URLCONF = "config.urls"
 # https://docs.djangoproject.com/en/dev/ref/settings/#wsgi-application
 WSGI_APPLICATION = "config.wsgi.application"
+# https://docs.djangoproject.com/en/dev/ref/settings/#asgi-application
+ASGI_APPLICATION = "config.asgi.application"
 
 # APPS
 # ------------------------------------------------------------------------------
@@ -124,6 +126,7 @@ AUTH_PASSWORD_VALIDATORS = [
 # https://docs.djangoproject.com/en/dev/ref/settings/#middleware
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "fires_watch.fires.compression.CompressionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.locale.LocaleMiddleware",
@@ -283,3 +286,30 @@ REST_FRAMEWORK = {
 CORS_URLS_REGEX = r"^/api/.*$"
 # Your stuff...
 # ------------------------------------------------------------------------------
+# Backend running chunks of large calculations: inline, thread or process
+FIRES_EXECUTION_BACKEND = env("FIRES_EXECUTION_BACKEND", default="inline")
+# Number of workers of the thread or process backend (see fires.backends)
+FIRES_EXECUTION_WORKERS = env.int("FIRES_EXECUTION_WORKERS", default=2)
+# Historical dataset of monthly returns and CPI, see build_historical_data
+# (none is bundled), "": the backtest endpoint is disabled
+FIRES_HISTORICAL_DATA = env("FIRES_HISTORICAL_DATA", default="")
+# Seconds calculate responses are cached (see fires.cache), 0: no caching
+FIRES_CALCULATE_CACHE_TIMEOUT = env.int("FIRES_CALCULATE_CACHE_TIMEOUT", default=3600)
+# Seconds proxies may cache GET calculate responses (at most until new year)
+FIRES_CALCULATE_MAX_AGE = env.int("FIRES_CALCULATE_MAX_AGE", default=3600)
+# Maximum size in bytes of the in-process cache of results (see fires.fires)
+FIRES_RESULT_CACHE_BYTES = env.int("FIRES_RESULT_CACHE_BYTES", default=32 * 2 ** 20)
+# Maximum size in bytes of the in-process cache of compressed responses (see fires.cache)
+FIRES_COMPRESSED_CACHE_BYTES = env.int(
+    "FIRES_COMPRESSED_CACHE_BYTES", default=8 * 2 ** 20
+)
+# Number of threads calculating for async views (see fires.api.views)
+FIRES_ASYNC_WORKERS = env.int("FIRES_ASYNC_WORKERS", default=4)
+# Seconds jobs and their results are kept (see fires.jobs)
+FIRES_JOB_TIMEOUT = env.int("FIRES_JOB_TIMEOUT", default=24 * 3600)
+# Seconds a job status stream is kept open (each holds a worker), see fires.jobs
+FIRES_JOB_STREAM_DURATION = env.int("FIRES_JOB_STREAM_DURATION", default=30)
+# Minimum size in bytes of API responses which are compressed (see fires.compression)
+FIRES_COMPRESSION_MIN_SIZE = env.int("FIRES_COMPRESSION_MIN_SIZE", default=1024)
+# gzip level of API responses (1 - 9), 0: no compression
+FIRES_COMPRESSION_LEVEL = env.int("FIRES_COMPRESSION_LEVEL", default=6)
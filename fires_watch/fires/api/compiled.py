@@ -0,0 +1,204 @@
+import functools
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.validators import (
+    MaxLengthValidator,
+    MaxValueValidator,
+    MinLengthValidator,
+    MinValueValidator,
+    ProhibitNullCharactersValidator,
+)
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import SkipField, empty
+from rest_framework.validators import ProhibitSurrogateCharactersValidator
+
+# Validators a fast path can check itself (see converter)
+BOUNDS = (MinValueValidator, MaxValueValidator)
+LENGTHS = (MinLengthValidator, MaxLengthValidator)
+CHARACTERS = (ProhibitNullCharactersValidator, ProhibitSurrogateCharactersValidator)
+
+
+def within(value, validators):
+    """Whether a value passes min/max (length) validators, like they compare."""
+    for validator in validators:
+        if validator.compare(validator.clean(value), validator.limit_value):
+            return False
+    return True
+
+
+def converter(field):
+    """
+    A function converting the common, valid input of a field exactly like
+    the field's run_validation would: JSON numbers, booleans and strings.
+    It returns empty for anything else (like strings of form data, missing or
+    invalid values), which the field then validates itself.
+
+    Returns None for fields without a fast path.
+    """
+    validators = field.validators
+    if isinstance(field, serializers.BooleanField) and not validators:
+        return lambda value: value if type(value) is bool else empty
+
+    if isinstance(field, serializers.IntegerField) and all(
+        isinstance(validator, BOUNDS) for validator in validators
+    ):
+        return lambda value: (
+            value if type(value) is int and within(value, validators) else empty
+        )
+
+    if isinstance(field, serializers.FloatField) and all(
+        isinstance(validator, BOUNDS) for validator in validators
+    ):
+
+        def convert(value):
+            if type(value) is int or type(value) is float:
+                value = float(value)
+                if within(value, validators):
+                    return value
+            return empty
+
+        return convert
+
+    if isinstance(field, serializers.ChoiceField) and not validators:
+        # Only choices that are strings themselves
+        choices = {
+            key: value
+            for key, value in field.choice_strings_to_values.items()
+            if key == value and key != ""
+        }
+        return lambda value: (
+            choices.get(value, empty) if type(value) is str else empty
+        )
+
+    if isinstance(field, serializers.CharField) and all(
+        isinstance(validator, (*LENGTHS, *CHARACTERS)) for validator in validators
+    ):
+        lengths = [
+            validator for validator in validators if isinstance(validator, LENGTHS)
+        ]
+
+        # NOTE: Only ASCII without null characters, which has no surrogates.
+        def convert(value):
+            if (
+                type(value) is str
+                and value
+                and (not field.trim_whitespace or value == value.strip())
+                and value.isascii()
+                and "\x00" not in value
+                and within(value, lengths)
+            ):
+                return value
+            return empty
+
+        return convert
+
+    return None
+
+
+class CompiledSerializer:
+    """
+    Validates input and represents validated data like a serializer class,
+    for serializers that are instantiated for every request (or item).
+
+    A serializer deep copies its declared fields on first use, and runs every
+    value through the general-purpose validation of its field. Instead, the
+    fields are bound once (to a prototype instance), and common valid values
+    are converted by a fast path per field (see converter), other values by
+    the field itself. Invalid input isn't handled: the serializer validates
+    it again, so errors are exactly the same.
+
+    Only serializers with the same fields for every instance are supported
+    (see supported).
+    """
+
+    def __init__(self, serializer_class):
+        self.prototype = serializer_class()
+        self.fields = self.prototype.fields
+        self.writable = [
+            (name, field, converter(field))
+            for name, field in self.fields.items()
+            if not field.read_only
+        ]
+        self.readable = [
+            (name, field) for name, field in self.fields.items() if not field.write_only
+        ]
+        self.read_only_defaults = any(
+            field.read_only and field.default is not empty
+            for field in self.fields.values()
+        )
+
+    @staticmethod
+    def supported(serializer_class):
+        """
+        Whether a serializer class has the same fields for every instance
+        (get_fields isn't overridden), and input fields with a plain source.
+        """
+        if serializer_class.get_fields is not serializers.Serializer.get_fields:
+            return False
+        fields = serializer_class().fields
+        return all(
+            field.source_attrs == [name]
+            for name, field in fields.items()
+            if not field.read_only
+        )
+
+    def to_internal_value(self, serializer, data):
+        """
+        Validated data of a serializer's input, or None if it is invalid.
+        """
+        if not isinstance(data, Mapping):
+            return None
+
+        validated = OrderedDict()
+        for name, field, convert in self.writable:
+            value = field.get_value(data)
+            converted = empty if convert is None else convert(value)
+            try:
+                if converted is empty:
+                    converted = field.run_validation(value)
+                validate = getattr(serializer, f"validate_{name}", None)
+                if validate is not None:
+                    converted = validate(converted)
+            except SkipField:
+                continue
+            except (ValidationError, DjangoValidationError):
+                return None
+            validated[name] = converted
+        return validated
+
+    def defaults(self):
+        """
+        Defaults of read-only fields (see Serializer._read_only_defaults), or
+        None if there are any: these may depend on the serializer's context.
+        """
+        return None if self.read_only_defaults else OrderedDict()
+
+    def to_representation(self, serializer, instance):
+        """Represent validated data (or an instance), see Serializer."""
+        representation = OrderedDict()
+        for name, field in self.readable:
+            try:
+                attribute = field.get_attribute(instance)
+            except SkipField:
+                continue
+            if isinstance(field, serializers.SerializerMethodField):
+                representation[name] = getattr(serializer, field.method_name)(attribute)
+            elif attribute is None:
+                representation[name] = None
+            else:
+                representation[name] = field.to_representation(attribute)
+        return representation
+
+
+@functools.lru_cache(maxsize=None)
+def compiled(serializer_class):
+    """
+    The compiled schema of a serializer class (see CompiledSerializer), or
+    None if it isn't supported.
+    """
+    if not CompiledSerializer.supported(serializer_class):
+        return None
+    return CompiledSerializer(serializer_class)
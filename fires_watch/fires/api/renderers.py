@@ -0,0 +1,325 @@
+import array
+import itertools
+import json
+import math
+import operator
+import struct
+import sys
+import uuid
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+# Exceptions of encoders for data that isn't plain JSON (e.g. decimals, lazy
+# translations, or NaN), which DRF's encoder then handles
+UNSUPPORTED = (TypeError, ValueError, OverflowError)
+
+# Encoder like JSONRenderer's (compact, with unicode characters, without NaN)
+python_encoder = JSONEncoder(
+    ensure_ascii=False, allow_nan=False, separators=(",", ":")
+).encode
+
+# Formats of numbers (floats must be finite)
+FORMATS = {int: "%d", float: "%r"}
+
+# Prefix of the strings which stand in for formatted rows (see encode_python)
+PLACEHOLDER = f"fires-rows-{uuid.uuid4().hex}-"
+
+
+def number_format(values):
+    """Format of values of a single number type (not booleans), or None."""
+    types = set(map(type, values))
+    if len(types) != 1:
+        return None
+    number_type = types.pop()
+    if number_type is float and not all(map(math.isfinite, values)):
+        return None
+    return FORMATS.get(number_type)
+
+
+def rows_template(rows):
+    """
+    Template of the JSON of rows (of graph data): objects with the same keys,
+    and a number type per key, with a placeholder per number. Returns the
+    template and the numbers, or None for other arrays.
+    """
+    first = rows[0]
+    if type(first) is not dict or not first:
+        return None
+    keys = first.keys()
+    if not (
+        set(map(type, rows)) == {dict}
+        and all(map(keys.__eq__, map(dict.keys, rows)))
+        and all(type(key) is str for key in keys)
+    ):
+        return None
+
+    values = list(itertools.chain.from_iterable(map(dict.values, rows)))
+    step = len(keys)
+    if set(map(type, values)) == {int}:
+        formats = [FORMATS[int]] * step
+    else:
+        formats = [number_format(values[index::step]) for index in range(step)]
+    if None in formats:
+        return None
+    row = ",".join(
+        f"{python_encoder(key)}:{format}" for key, format in zip(keys, formats)
+    )
+    return ",".join(["{" + row + "}"] * len(rows)), values
+
+
+def replace_rows(obj, rows):
+    """
+    Copy of obj with its rows (see rows_template) replaced by placeholders,
+    and their JSON added to rows (by placeholder). Objects without rows are
+    returned as they are.
+    """
+    if type(obj) is list and obj:
+        template = rows_template(obj)
+        if template is None:
+            return obj
+        placeholder = f"{PLACEHOLDER}{len(rows)}"
+        rows[placeholder] = "[" + template[0] % tuple(template[1]) + "]"
+        return placeholder
+    if isinstance(obj, dict):
+        replaced = {
+            key: replace_rows(value, rows)
+            for key, value in obj.items()
+            if type(value) is list or isinstance(value, dict)
+        }
+        if any(replaced[key] is not obj[key] for key in replaced):
+            return {**obj, **replaced}
+    return obj
+
+
+def encode_python(data):
+    """
+    Encode data like python_encoder, with rows of numbers (graph data)
+    formatted at once, which is faster than encoding them object by object.
+    Everything else is encoded by python_encoder, in a single pass.
+
+    Data without such rows is encoded by encode_drf, which is faster without
+    the placeholders to replace.
+    """
+    rows = {}
+    replaced = replace_rows(data, rows)
+    if not rows:
+        return encode_drf(data)
+    content = python_encoder(replaced)
+    for placeholder, formatted in rows.items():
+        content = content.replace(f'"{placeholder}"', formatted, 1)
+    return content.encode()
+
+
+def encode_orjson(data):
+    return orjson.dumps(data)
+
+
+def encode_ujson(data):
+    return ujson.dumps(
+        data, ensure_ascii=False, escape_forward_slashes=False, allow_nan=False
+    ).encode()
+
+
+def encode_drf(data):
+    return json.dumps(
+        data,
+        cls=JSONEncoder,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode()
+
+
+# Encoders by name, fastest first (if installed)
+ENCODERS = {
+    "orjson": encode_orjson if orjson is not None else None,
+    "ujson": encode_ujson if ujson is not None else None,
+    "python": encode_python,
+    "drf": encode_drf,
+}
+
+
+class FiresJSONRenderer(JSONRenderer):
+    """
+    Renders JSON like DRF's JSONRenderer, faster for large graph data (up to
+    thousands of integers per response).
+
+    Data is encoded by orjson or ujson if installed, or written by encode_python
+    otherwise. Indented (browsable) JSON, non-compact or ASCII-only settings,
+    and data these encoders don't support, are rendered by JSONRenderer.
+
+    Unlike JSONRenderer, orjson encodes NaN and infinity as null (instead of
+    failing), which calculations never return.
+    """
+
+    encoder = staticmethod(
+        next(encode for encode in ENCODERS.values() if encode is not None)
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            data is None
+            or self.get_indent(accepted_media_type, renderer_context or {})
+            or not self.compact
+            or self.ensure_ascii
+            or not self.strict
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            content = self.encoder(data)
+        except UNSUPPORTED:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Escaped by JSONRenderer, as they aren't valid in JavaScript strings
+        if b"\xe2\x80\xa8" in content or b"\xe2\x80\xa9" in content:
+            content = content.replace(b"\xe2\x80\xa8", b"\\u2028")
+            content = content.replace(b"\xe2\x80\xa9", b"\\u2029")
+        return content
+
+
+# Graph data of binary responses (see FiresGraphRenderer)
+GRAPH_MAGIC = b"FWGB"
+GRAPH_VERSION = 1
+GRAPH_DATASETS = ("graph_months", "graph_years")
+GRAPH_HEADER = struct.Struct("<4sHHI")
+ARRAY_HEADER = struct.Struct("<HcI")
+
+# Array types, narrowest first: int32, int64 and float64
+INTEGER_TYPES = ("i", "q", "d")
+
+
+def padding(offset):
+    """Zero bytes to align an offset to 8 bytes."""
+    return bytes(-offset % 8)
+
+
+def pack_values(values):
+    """
+    Pack a list of numbers as a little-endian array: of the narrowest type
+    integers fit in, or of floats.
+    """
+    types = ("d",) if values and type(values[0]) is float else INTEGER_TYPES
+    for typecode in types:
+        try:
+            packed = array.array(typecode, values)
+        except OverflowError:
+            continue
+        if sys.byteorder == "big":
+            packed.byteswap()
+        return packed
+    raise OverflowError("Graph values are too large for float64")
+
+
+def graph_arrays(dataset):
+    """
+    Arrays of the fields of a graph dataset (see Result), by field, in
+    either format (a list of datapoints, or a list per field).
+    """
+    if isinstance(dataset, dict):
+        return {field: pack_values(values) for field, values in dataset.items()}
+    if not dataset:
+        return {}
+    return {
+        field: pack_values(list(map(operator.itemgetter(field), dataset)))
+        for field in dataset[0]
+    }
+
+
+class FiresGraphRenderer(BaseRenderer):
+    """
+    Renders a calculate response with its graph data as packed arrays, for
+    clients which would rather not parse thousands of numbers from JSON.
+
+    Layout (little-endian):
+    - Header: magic b"FWGB", version (uint16), number of arrays (uint16) and
+      length of the summary (uint32)
+    - Summary: the response without graph data, as JSON
+    - Per array: length of the name (uint16), type ("i": int32, "q": int64 or
+      "d": float64), number of values (uint32), the name (e.g.
+      "graph_months.portfolio"), and the values, starting at a multiple of
+      8 bytes (from the start of the content)
+
+    Data without a result (like validation errors) only has a summary. See
+    unpack_graph for a reader.
+    """
+
+    media_type = "application/octet-stream"
+    format = "bin"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        # The result of version 1 (fires_calculate_result), or of version 2
+        summary = dict(data)
+        result = summary.get("fires_calculate_result", summary)
+        arrays = {}
+        if isinstance(result, dict) and any(key in result for key in GRAPH_DATASETS):
+            result = dict(result)
+            for dataset in GRAPH_DATASETS:
+                for field, values in graph_arrays(result.pop(dataset, [])).items():
+                    arrays[f"{dataset}.{field}"] = values
+            if "fires_calculate_result" in summary:
+                summary["fires_calculate_result"] = result
+            else:
+                summary = result
+
+        encoded = FiresJSONRenderer().render(summary)
+        parts = [
+            GRAPH_HEADER.pack(GRAPH_MAGIC, GRAPH_VERSION, len(arrays), len(encoded)),
+            encoded,
+        ]
+        offset = GRAPH_HEADER.size + len(encoded)
+        for name, values in arrays.items():
+            name = name.encode()
+            header = ARRAY_HEADER.pack(len(name), values.typecode.encode(), len(values))
+            offset += len(header) + len(name)
+            pad = padding(offset)
+            parts.extend([header, name, pad, memoryview(values)])
+            offset += len(pad) + len(values) * values.itemsize
+        return b"".join(parts)
+
+
+def unpack_graph(content):
+    """
+    Read a response of FiresGraphRenderer: returns the summary, and the
+    arrays by name (memoryviews of the content, without copying).
+    """
+    content = memoryview(content)
+    magic, version, count, length = GRAPH_HEADER.unpack_from(content)
+    if magic != GRAPH_MAGIC or version != GRAPH_VERSION:
+        raise ValueError("Not graph data of a supported version")
+    offset = GRAPH_HEADER.size
+    end = offset + length
+    summary = json.loads(bytes(content[offset:end]))
+
+    arrays = {}
+    for _ in range(count):
+        name_length, typecode, size = ARRAY_HEADER.unpack_from(content, end)
+        offset = end + ARRAY_HEADER.size
+        end = offset + name_length
+        name = bytes(content[offset:end]).decode()
+        typecode = typecode.decode()
+        offset = end + len(padding(end))
+        end = offset + size * struct.calcsize(f"<{typecode}")
+        values = content[offset:end].cast(typecode)
+        if sys.byteorder == "big":
+            values = array.array(typecode, values)
+            values.byteswap()
+            values = memoryview(values)
+        arrays[name] = values
+    return summary, arrays
@@ -0,0 +1,57 @@
+import gzip
+import json
+
+from django.http import StreamingHttpResponse
+from rest_framework.response import Response
+
+from fires_watch.fires import compression
+
+
+class RenderedResponse(Response):
+    """
+    A Response with content that is already rendered (e.g. from the cache),
+    so rendering is skipped.
+
+    The data is only decoded from the content when it is accessed (and
+    decompressed, see compression.compress).
+    """
+
+    def __init__(self, content, data=None, **kwargs):
+        super().__init__(data=data, **kwargs)
+        self.rendered = content
+
+    @property
+    def data(self):
+        if self._data is None:
+            content = self.rendered
+            if compression.is_compressed(content):
+                content = gzip.decompress(content)
+            self._data = json.loads(content)
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+    @property
+    def rendered_content(self):
+        self["Content-Type"] = self.content_type
+        return self.rendered
+
+
+class NDJSONResponse(StreamingHttpResponse):
+    """
+    Streams objects as newline-delimited JSON, one line per object.
+
+    Objects are encoded as they are taken from the iterable, so nothing has
+    to be held in memory but the current line.
+    """
+
+    content_type = "application/x-ndjson"
+
+    def __init__(self, objects, **kwargs):
+        kwargs.setdefault("content_type", self.content_type)
+        super().__init__(
+            (json.dumps(obj, separators=(",", ":")) + "\n" for obj in objects),
+            **kwargs,
+        )
@@ -1,9 +1,96 @@
+import datetime
+
+from django.conf import settings
 from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+from fires_watch.fires import backends
+from fires_watch.fires.api.compiled import compiled
+from fires_watch.fires.fires import GOAL_FIELDS, SWEEP_FIELDS, Fires
+from fires_watch.fires.jobs import JOB_KINDS, job_serializer
+from fires_watch.fires.montecarlo import DISTRIBUTIONS
+
+# Maximum number of calculations in a single batch request
+MAX_BATCH_SIZE = 100
+
+# Maximum number of values per axis of a sweep
+MAX_SWEEP_STEPS = 200
+
+# Maximum number of paths of a Monte Carlo simulation, in a request (about a
+# second of calculation), and in a job (see FiresMonteCarloJobSerializer)
+MAX_MONTE_CARLO_PATHS = 20000
+MAX_MONTE_CARLO_JOB_PATHS = 100000
+
+# Maximum number of datapoints of a graph dataset (every month)
+MAX_GRAPH_POINTS = 1200
+
+# Maximum number of months of a goal seek (as far as the calculation goes)
+MAX_GOAL_MONTHS = 1200
+
+
+class FiresCalculateListSerializer(serializers.ListSerializer):
+    """
+    Validates and calculates a list of calculations at once.
+
+    Unlike the default ListSerializer, an invalid item does not invalidate
+    the whole list: it is kept as None in the validated data, and its errors
+    are returned in its place. All valid items are calculated together in a
+    single batch (see Fires.calculate_many), and only their results are
+    returned, in the same order as the input.
+    """
 
-from fires_watch.fires.fires import Fires
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            message = self.error_messages["not_a_list"].format(
+                input_type=type(data).__name__
+            )
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [message]}, code="not_a_list"
+            )
+        if len(data) > MAX_BATCH_SIZE:
+            message = f"Ensure this list has no more than {MAX_BATCH_SIZE} items."
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [message]}, code="max_length"
+            )
 
+        validated = []
+        self.item_errors = []
+        for item in data:
+            try:
+                validated.append(self.child.run_validation(item))
+                self.item_errors.append({})
+            except serializers.ValidationError as exc:
+                validated.append(None)
+                self.item_errors.append(exc.detail)
+        return validated
 
-class FiresCalculateSerializer(serializers.Serializer):
+    def to_representation(self, data):
+        # Group the items by their options, and calculate a batch per group.
+        # Full results use the vectorized engine, which batches scenarios
+        # (with the same results as the iterative engine).
+        groups = {}
+        for index, item in enumerate(data):
+            if item is not None:
+                engine, *options = self.child.get_options(item)
+                if engine == "iterative":
+                    engine = "vectorized"
+                groups.setdefault((engine, *options), []).append(index)
+
+        results = [None] * len(data)
+        for (engine, *options), indices in groups.items():
+            batch = Fires.calculate_many(
+                [data[index] for index in indices], engine, *options
+            )
+            for index, result in zip(indices, batch):
+                results[index] = result
+
+        return [
+            {"fires_calculate_result": result} if item is not None else errors
+            for item, result, errors in zip(data, results, self.item_errors)
+        ]
+
+
+class FiresInputSerializer(serializers.Serializer):
     """
     Serializer requires the following arguments:
     - Year Of Birth (integer: 1900 - now)
@@ -35,8 +122,262 @@ class FiresCalculateSerializer(serializers.Serializer):
         min_value=1, max_value=10, default=4
     )
 
+    # NOTE: Valid input is validated and represented by the compiled schema of
+    #       the serializer class (see CompiledSerializer). Invalid input is
+    #       validated again by the fields, for their errors.
+    def to_internal_value(self, data):
+        schema = compiled(type(self))
+        validated = None if schema is None else schema.to_internal_value(self, data)
+        if validated is None:
+            validated = super().to_internal_value(data)
+        return validated
+
+    def _read_only_defaults(self):
+        schema = compiled(type(self))
+        defaults = None if schema is None else schema.defaults()
+        if defaults is None:
+            defaults = super()._read_only_defaults()
+        return defaults
+
+    def to_representation(self, instance):
+        schema = compiled(type(self))
+        if schema is None:
+            return super().to_representation(instance)
+        return schema.to_representation(self, instance)
+
+
+class FiresCalculateSerializer(FiresInputSerializer):
+    """
+    Serializer requires the user input (see FiresInputSerializer), and:
+    - Summary only, skips the graph data (boolean: default false)
+    - Format of the graph data (string: rows/columns, default rows)
+        rows: a list of datapoints, columns: a list per value
+    - Maximum number of datapoints per graph dataset (integer: 3 - 1200,
+      default all), e.g. for small screens. Monthly datapoints then include
+      their month.
+    """
+
+    class Meta:
+        list_serializer_class = FiresCalculateListSerializer
+
+    # Options
+    summary_only = serializers.BooleanField(default=False)
+    graph_format = serializers.ChoiceField(choices=["rows", "columns"], default="rows")
+    max_points = serializers.IntegerField(
+        min_value=3, max_value=MAX_GRAPH_POINTS, required=False
+    )
+
     # Calculated output
     fires_calculate_result = serializers.SerializerMethodField()
 
+    @staticmethod
+    def get_options(inst):
+        """
+        Calculation engine, whether graph data is columnar, and the maximum
+        number of datapoints.
+        """
+        engine = "summary" if inst["summary_only"] else "iterative"
+        return engine, inst["graph_format"] == "columns", inst.get("max_points")
+
+    def is_calculated(self):
+        """Determine whether the result is cached in this process."""
+        data = self.validated_data
+        return Fires.is_cached(data, *self.get_options(data))
+
     def get_fires_calculate_result(self, inst):
-        return Fires.calculate(inst)
+        return Fires.calculate(inst, *self.get_options(inst))
+
+
+class FiresSweepAxisSerializer(serializers.Serializer):
+    """
+    Serializer requires the following arguments:
+    - Field of the user input to sweep (string: see SWEEP_FIELDS)
+    - First value (number: valid value for the field)
+    - Last value (number: valid value for the field)
+    - Number of values (integer: 1 - 200)
+    """
+
+    field = serializers.ChoiceField(choices=SWEEP_FIELDS)
+    start = serializers.FloatField()
+    stop = serializers.FloatField()
+    steps = serializers.IntegerField(min_value=1, max_value=MAX_SWEEP_STEPS)
+
+
+class FiresSweepSerializer(FiresInputSerializer):
+    """
+    Serializer requires the user input (see FiresInputSerializer), and:
+    - Two axes to sweep (see FiresSweepAxisSerializer)
+    The user input values of the swept fields are optional, and ignored.
+    """
+
+    x = FiresSweepAxisSerializer()
+    y = FiresSweepAxisSerializer()
+
+    # Calculated output
+    fires_sweep_result = serializers.SerializerMethodField()
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for name in ["x", "y"]:
+            axis = getattr(self, "initial_data", {}).get(name)
+            if isinstance(axis, dict) and axis.get("field") in SWEEP_FIELDS:
+                fields[axis["field"]].required = False
+        return fields
+
+    def validate(self, attrs):
+        if attrs["x"]["field"] == attrs["y"]["field"]:
+            raise serializers.ValidationError(
+                {"y": {"field": ["Must be different from the x axis field."]}}
+            )
+
+        # The axis values must be valid values of the swept field
+        for name in ["x", "y"]:
+            axis = attrs[name]
+            field = self.fields[axis["field"]]
+            for key in ["start", "stop"]:
+                try:
+                    field.run_validation(axis[key])
+                except serializers.ValidationError as exc:
+                    raise serializers.ValidationError({name: {key: exc.detail}})
+        return attrs
+
+    def get_fires_sweep_result(self, inst):
+        return Fires.sweep(inst, inst["x"], inst["y"], backend=backends.get_backend())
+
+
+class FiresSensitivitySerializer(FiresInputSerializer):
+    """
+    Serializer requires the user input (see FiresInputSerializer).
+    Every field of SENSITIVITY_STEPS is perturbed around its input value.
+    """
+
+    # Calculated output
+    fires_sensitivity_result = serializers.SerializerMethodField()
+
+    def get_fires_sensitivity_result(self, inst):
+        return Fires.sensitivity(inst)
+
+
+class FiresGoalSeekSerializer(FiresInputSerializer):
+    """
+    Serializer requires the user input (see FiresInputSerializer), and:
+    - Field of the user input to solve for (string: see GOAL_FIELDS)
+    - Target age (integer), or target months from now (integer: 1 - 1200)
+    The user input value of the solved field is optional, and ignored.
+    """
+
+    field = serializers.ChoiceField(choices=list(GOAL_FIELDS))
+    target_age = serializers.IntegerField(min_value=0, required=False)
+    target_months = serializers.IntegerField(
+        min_value=1, max_value=MAX_GOAL_MONTHS, required=False
+    )
+
+    # Calculated output
+    fires_goal_seek_result = serializers.SerializerMethodField()
+
+    def get_fields(self):
+        fields = super().get_fields()
+        field = getattr(self, "initial_data", {}).get("field")
+        if field in GOAL_FIELDS:
+            fields[field].required = False
+        return fields
+
+    def validate(self, attrs):
+        if ("target_age" in attrs) == ("target_months" in attrs):
+            raise serializers.ValidationError(
+                "Either target_age or target_months is required."
+            )
+        if "target_age" in attrs:
+            # Retiring at an age includes every month until the next birthday
+            age = datetime.date.today().year - attrs["birth_year"]
+            months = 12 * (attrs["target_age"] - age) + 11
+            if not 1 <= months <= MAX_GOAL_MONTHS:
+                raise serializers.ValidationError(
+                    {"target_age": [f"Must be between {age} and {age + 99}."]}
+                )
+            attrs["target_months"] = months
+        return attrs
+
+    def get_fires_goal_seek_result(self, inst):
+        return Fires.goal_seek(inst, inst["field"], inst["target_months"])
+
+
+class FiresMonteCarloSerializer(FiresInputSerializer):
+    """
+    Serializer requires the user input (see FiresInputSerializer), and:
+    - Number of paths to simulate (integer: 1 - 20000, default 10000)
+    - Random seed, for reproducible results (integer: >=0, optional)
+    - Distribution of returns and inflation (string: normal/lognormal)
+    - Standard deviation of portfolio ROR (float percentage: 0 - 100)
+    - Standard deviation of inflation (float percentage: 0 - 100)
+    The portfolio ROR and inflation of the user input are used as mean.
+    """
+
+    paths = serializers.IntegerField(
+        min_value=1, max_value=MAX_MONTE_CARLO_PATHS, default=10000
+    )
+    seed = serializers.IntegerField(min_value=0, required=False)
+    distribution = serializers.ChoiceField(choices=DISTRIBUTIONS, default="normal")
+    portfolio_percentage_std = serializers.FloatField(
+        min_value=0, max_value=100, default=15
+    )
+    inflation_percentage_std = serializers.FloatField(
+        min_value=0, max_value=100, default=1
+    )
+
+    # Calculated output
+    fires_monte_carlo_result = serializers.SerializerMethodField()
+
+    def get_fires_monte_carlo_result(self, inst):
+        return Fires.monte_carlo(
+            inst,
+            inst["paths"],
+            seed=inst.get("seed"),
+            return_std=inst["portfolio_percentage_std"],
+            inflation_std=inst["inflation_percentage_std"],
+            distribution=inst["distribution"],
+            backend=backends.get_backend(),
+        )
+
+
+class FiresMonteCarloJobSerializer(FiresMonteCarloSerializer):
+    """
+    Serializer of a Monte Carlo simulation queued as a job (see jobs), which
+    may simulate more paths (integer: 1 - 100000) than a request.
+    """
+
+    paths = serializers.IntegerField(
+        min_value=1, max_value=MAX_MONTE_CARLO_JOB_PATHS, default=10000
+    )
+
+
+class FiresBacktestSerializer(FiresInputSerializer):
+    """
+    Serializer requires the user input (see FiresInputSerializer).
+    The portfolio ROR and inflation of the user input are replaced by the
+    historical data.
+    """
+
+    # Calculated output
+    fires_backtest_result = serializers.SerializerMethodField()
+
+    def get_fires_backtest_result(self, inst):
+        return Fires.backtest(inst, settings.FIRES_HISTORICAL_DATA)
+
+
+class FiresJobSerializer(serializers.Serializer):
+    """
+    Serializer requires the following arguments:
+    - Kind of calculation (string: monte_carlo/sweep)
+    - Input of the calculation (object: see the serializer of the kind)
+    """
+
+    kind = serializers.ChoiceField(choices=list(JOB_KINDS))
+    input = serializers.DictField()
+
+    def validate(self, attrs):
+        serializer = job_serializer(attrs["kind"])(data=attrs["input"])
+        if not serializer.is_valid():
+            raise serializers.ValidationError({"input": serializer.errors})
+        attrs["input"] = serializer.validated_data
+        return attrs
@@ -1,22 +1,510 @@
+import asyncio
+import functools
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+from django.http import (
+    HttpResponse,
+    HttpResponseNotAllowed,
+    HttpResponseNotModified,
+    JsonResponse,
+)
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from rest_framework import status
 from rest_framework.decorators import action
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from rest_framework.viewsets import GenericViewSet
 
-from fires_watch.fires.api.serializers import FiresCalculateSerializer
+from fires_watch.fires import cache, compression, jobs
+from fires_watch.fires.api.renderers import FiresGraphRenderer, FiresJSONRenderer
+from fires_watch.fires.api.responses import NDJSONResponse, RenderedResponse
+from fires_watch.fires.api.serializers import (
+    FiresBacktestSerializer,
+    FiresCalculateSerializer,
+    FiresGoalSeekSerializer,
+    FiresInputSerializer,
+    FiresJobSerializer,
+    FiresMonteCarloSerializer,
+    FiresSensitivitySerializer,
+    FiresSweepSerializer,
+)
+from fires_watch.fires.fires import Fires
 
+# Renderers of the calculate actions, which can also respond with binary graph
+# data (e.g. Accept: application/octet-stream)
+CALCULATE_RENDERERS = [FiresJSONRenderer, BrowsableAPIRenderer, FiresGraphRenderer]
 
-class FiresViewSet(GenericViewSet):
-    @action(detail=False, methods=["POST"], permission_classes=[AllowAny])
+
+class CachedCalculateMixin:
+    """
+    Cached responses of the calculate action, with the data of
+    get_calculate_data (cached under cache_prefix).
+    """
+
+    cache_prefix = cache.PREFIX
+
+    def get_calculate_data(self, serializer):
+        return serializer.data
+
+    def cached_response(self, request, serializer):
+        """
+        Respond with the calculated data of a valid serializer, from the cache
+        if the same input was calculated before (see cache.calculate_key).
+
+        Results cached in this process (see fires.ResultCache) are rendered
+        without looking up the shared cache, to skip the network round-trip.
+        Only compact JSON responses are cached, other formats (like the
+        browsable API, or JSON with an indent) are always rendered.
+
+        JSON responses have an ETag (see cache.etag), a client which already
+        has the response (If-None-Match) gets a 304 without a calculation, or
+        a 412 for a POST request (like Django's conditional responses).
+        GET responses may also be cached by proxies (see cache.max_age).
+
+        For clients accepting gzip, the compressed content is cached (see
+        cache.load_content), in this process as well, so it is only
+        compressed once.
+        """
+        renderer = request.accepted_renderer
+        if renderer.format != "json" or renderer.get_indent(
+            request.accepted_media_type, self.get_renderer_context()
+        ):
+            return Response(
+                status=status.HTTP_200_OK, data=self.get_calculate_data(serializer)
+            )
+
+        compress = compression.accepts(request)
+        etag = cache.etag(serializer.validated_data)
+        content = None
+        if cache.is_not_modified(request, etag):
+            # Only GET (and HEAD) requests get a 304 (RFC 9110, 13.1.2)
+            if request.method not in ("GET", "HEAD"):
+                return HttpResponse(status=status.HTTP_412_PRECONDITION_FAILED)
+            response = HttpResponseNotModified()
+            etag = cache.not_modified_etag(request, etag, compress)
+        elif serializer.is_calculated() and not compress:
+            response = Response(
+                status=status.HTTP_200_OK, data=self.get_calculate_data(serializer)
+            )
+        else:
+            data = None
+
+            def render():
+                nonlocal data
+                data = self.get_calculate_data(serializer)
+                return renderer.render(
+                    data, request.accepted_media_type, self.get_renderer_context()
+                )
+
+            content = cache.load_content(
+                cache.calculate_key(serializer.validated_data, self.cache_prefix),
+                render,
+                compress,
+                local=serializer.is_calculated(),
+            )
+            response = RenderedResponse(
+                content,
+                data=data,
+                status=status.HTTP_200_OK,
+                content_type=renderer.media_type,
+            )
+
+        response["ETag"] = etag
+        if content is not None and compression.is_compressed(content):
+            compression.set_encoding(response)
+        if request.method == "GET":
+            patch_cache_control(response, public=True, max_age=cache.max_age())
+            patch_vary_headers(response, ["Accept"])
+        return response
+
+
+class FiresViewSet(CachedCalculateMixin, GenericViewSet):
+    renderer_classes = [FiresJSONRenderer, BrowsableAPIRenderer]
+
+    # NOTE: Results don't depend on the user, so calculate doesn't authenticate.
+    #       Otherwise the session is accessed, and responses vary on the cookie.
+    @action(
+        detail=False,
+        methods=["GET", "POST"],
+        permission_classes=[AllowAny],
+        authentication_classes=[],
+        renderer_classes=CALCULATE_RENDERERS,
+    )
     def calculate(self, request):
+        """
+        Calculate a payload, posted or as query parameters. GET requests can
+        be cached by proxies, e.g. /api/fires/calculate/?birth_year=1984&...
+
+        Responds with JSON, or with the graph data as packed arrays (see
+        FiresGraphRenderer) for Accept: application/octet-stream.
+        """
+        data = request.query_params if request.method == "GET" else request.data
+        serializer = FiresCalculateSerializer(context={"request": request}, data=data)
+        if serializer.is_valid():
+            return self.cached_response(request, serializer)
+        else:
+            return Response(
+                status=status.HTTP_400_BAD_REQUEST,
+                data=serializer.error_messages,
+            )
+
+    @action(
+        detail=False,
+        methods=["POST"],
+        permission_classes=[AllowAny],
+        url_path="calculate-stream",
+    )
+    def calculate_stream(self, request):
+        """
+        Calculate a payload (see calculate), streamed as newline-delimited
+        JSON (see Fires.stream).
+
+        The first line holds the input and the result without graph data (as
+        with summary_only), followed by a line per month of graph data (unless
+        summary_only). Months are sent while they are calculated, so they
+        are never downsampled (max_points doesn't apply), and always sent as
+        rows (graph_format columns is invalid).
+        """
         serializer = FiresCalculateSerializer(
             context={"request": request}, data=request.data
         )
+        if not serializer.is_valid():
+            return Response(
+                status=status.HTTP_400_BAD_REQUEST,
+                data=serializer.errors,
+            )
+        if serializer.validated_data["graph_format"] != "rows":
+            return Response(
+                status=status.HTTP_400_BAD_REQUEST,
+                data={"graph_format": ["Streamed months are always rows."]},
+            )
+
+        data = serializer.validated_data
+        summary, months = Fires.stream(data)
+        first = {
+            **FiresInputSerializer(data).data,
+            "summary_only": data["summary_only"],
+            "graph_format": data["graph_format"],
+            "fires_calculate_result": summary,
+        }
+        if data["summary_only"]:
+            months = []
+        return NDJSONResponse(itertools.chain([first], months))
+
+    @action(detail=False, methods=["POST"], permission_classes=[AllowAny])
+    def batch(self, request):
+        """
+        Calculate a list of payloads (see calculate) in a single request.
+
+        Results are returned in order, invalid items are replaced by their
+        validation errors.
+        """
+        serializer = FiresCalculateSerializer(
+            context={"request": request}, data=request.data, many=True
+        )
         if serializer.is_valid():
             return Response(status=status.HTTP_200_OK, data=serializer.data)
         else:
             return Response(
                 status=status.HTTP_400_BAD_REQUEST,
-                data=serializer.error_messages,
+                data=serializer.errors,
+            )
+
+    @action(detail=False, methods=["POST"], permission_classes=[AllowAny])
+    def sweep(self, request):
+        """Calculate a grid of retirement months/ages over two input fields."""
+        serializer = FiresSweepSerializer(
+            context={"request": request}, data=request.data
+        )
+        if serializer.is_valid():
+            return Response(status=status.HTTP_200_OK, data=serializer.data)
+        else:
+            return Response(
+                status=status.HTTP_400_BAD_REQUEST,
+                data=serializer.errors,
+            )
+
+    @action(detail=False, methods=["POST"], permission_classes=[AllowAny])
+    def sensitivity(self, request):
+        """Change in retirement month per unit of input (see Fires.sensitivity)."""
+        serializer = FiresSensitivitySerializer(
+            context={"request": request}, data=request.data
+        )
+        if serializer.is_valid():
+            return Response(status=status.HTTP_200_OK, data=serializer.data)
+        else:
+            return Response(
+                status=status.HTTP_400_BAD_REQUEST,
+                data=serializer.errors,
+            )
+
+    @action(
+        detail=False,
+        methods=["POST"],
+        permission_classes=[AllowAny],
+        url_path="goal-seek",
+    )
+    def goal_seek(self, request):
+        """Solve an input for a target retirement age (see Fires.goal_seek)."""
+        serializer = FiresGoalSeekSerializer(
+            context={"request": request}, data=request.data
+        )
+        if serializer.is_valid():
+            return Response(status=status.HTTP_200_OK, data=serializer.data)
+        else:
+            return Response(
+                status=status.HTTP_400_BAD_REQUEST,
+                data=serializer.errors,
+            )
+
+    @action(
+        detail=False,
+        methods=["POST"],
+        permission_classes=[AllowAny],
+        url_path="monte-carlo",
+    )
+    def monte_carlo(self, request):
+        """Simulate random returns and inflation (see Fires.monte_carlo)."""
+        serializer = FiresMonteCarloSerializer(
+            context={"request": request}, data=request.data
+        )
+        if serializer.is_valid():
+            return Response(status=status.HTTP_200_OK, data=serializer.data)
+        else:
+            return Response(
+                status=status.HTTP_400_BAD_REQUEST,
+                data=serializer.errors,
             )
+
+    @action(detail=False, methods=["POST"], permission_classes=[AllowAny])
+    def backtest(self, request):
+        """Replay the historical dataset (see Fires.backtest)."""
+        if not settings.FIRES_HISTORICAL_DATA:
+            return Response(
+                status=status.HTTP_404_NOT_FOUND,
+                data={"detail": "Backtesting is not enabled."},
+            )
+        if not os.path.exists(settings.FIRES_HISTORICAL_DATA):
+            return Response(
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                data={"detail": "Historical data is not available."},
+            )
+
+        serializer = FiresBacktestSerializer(
+            context={"request": request}, data=request.data
+        )
+        if serializer.is_valid():
+            return Response(status=status.HTTP_200_OK, data=serializer.data)
+        else:
+            return Response(
+                status=status.HTTP_400_BAD_REQUEST,
+                data=serializer.errors,
+            )
+
+    @action(detail=False, methods=["POST"], permission_classes=[AllowAny])
+    def jobs(self, request):
+        """
+        Queue a long-running calculation (see jobs.JobQueue), and return the
+        job with the URL to poll for its result.
+        """
+        serializer = FiresJobSerializer(context={"request": request}, data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                status=status.HTTP_400_BAD_REQUEST,
+                data=serializer.errors,
+            )
+
+        data = serializer.validated_data
+        job = jobs.get_queue().submit(data["kind"], data["input"])
+        url = reverse("api:fires-job", kwargs={"job_id": job["id"]}, request=request)
+        return Response(
+            status=status.HTTP_202_ACCEPTED,
+            data={**jobs.public(job, result=False), "url": url},
+            headers={"Location": url},
+        )
+
+    @action(
+        detail=False,
+        methods=["GET"],
+        permission_classes=[AllowAny],
+        url_path=r"jobs/(?P<job_id>[0-9a-f]{32})",
+    )
+    def job(self, request, job_id):
+        """Status of a job, with the result once it is done."""
+        job = jobs.get_queue().get(job_id)
+        if job is None:
+            return Response(
+                status=status.HTTP_404_NOT_FOUND,
+                data={"detail": "Job not found."},
+            )
+        return Response(status=status.HTTP_200_OK, data=jobs.public(job))
+
+    @action(
+        detail=False,
+        methods=["GET"],
+        permission_classes=[AllowAny],
+        url_path=r"jobs/(?P<job_id>[0-9a-f]{32})/stream",
+    )
+    def job_stream(self, request, job_id):
+        """
+        Stream the status of a job as newline-delimited JSON (see
+        jobs.updates), the last line holds the result once it is done. The
+        stream ends after FIRES_JOB_STREAM_DURATION seconds, unfinished jobs
+        are then polled (or streamed again).
+        """
+        if jobs.get_queue().get(job_id) is None:
+            return Response(
+                status=status.HTTP_404_NOT_FOUND,
+                data={"detail": "Job not found."},
+            )
+        return NDJSONResponse(jobs.updates(job_id))
+
+    @action(
+        detail=False,
+        methods=["GET"],
+        permission_classes=[IsAdminUser],
+        url_path="jobs/metrics",
+    )
+    def job_metrics(self, request):
+        """Queue depth, and job counts and latencies (see JobQueue.metrics)."""
+        return Response(status=status.HTTP_200_OK, data=jobs.get_queue().metrics())
+
+
+class FiresV2ViewSet(CachedCalculateMixin, GenericViewSet):
+    """
+    Version 2 of the fires API, for high-volume clients: responses hold only
+    the calculated result, without the input echoed back.
+    """
+
+    renderer_classes = [FiresJSONRenderer, BrowsableAPIRenderer]
+    cache_prefix = cache.RESULT_PREFIX
+
+    def get_calculate_data(self, serializer):
+        """
+        Calculate the result before rendering, and record the time it took
+        (see calculate), unless it is cached in this process.
+        """
+        data = serializer.validated_data
+        if serializer.is_calculated():
+            return Fires.calculate(data, *serializer.get_options(data))
+
+        start = time.perf_counter()
+        result = Fires.calculate(data, *serializer.get_options(data))
+        self.calculate_duration = time.perf_counter() - start
+        return result
+
+    @action(
+        detail=False,
+        methods=["GET", "POST"],
+        permission_classes=[AllowAny],
+        authentication_classes=[],
+        renderer_classes=CALCULATE_RENDERERS,
+    )
+    def calculate(self, request):
+        """
+        Calculate a payload, like version 1 (see FiresViewSet.calculate), but
+        only respond with the result (its fires_calculate_result).
+
+        Responses that were calculated have a Server-Timing header with the
+        duration of the calculation (in milliseconds). Responses of results
+        cached in this process, or in the shared cache, were not calculated.
+        """
+        data = request.query_params if request.method == "GET" else request.data
+        serializer = FiresCalculateSerializer(context={"request": request}, data=data)
+        if not serializer.is_valid():
+            return Response(
+                status=status.HTTP_400_BAD_REQUEST,
+                data=serializer.errors,
+            )
+
+        self.calculate_duration = None
+        response = self.cached_response(request, serializer)
+        if self.calculate_duration is not None:
+            response[
+                "Server-Timing"
+            ] = f"calculate;dur={self.calculate_duration * 1000:.3f}"
+        return response
+
+
+@functools.lru_cache(maxsize=None)
+def calculation_executor():
+    """Bounded pool of threads (FIRES_ASYNC_WORKERS) for async views."""
+    return ThreadPoolExecutor(
+        max_workers=settings.FIRES_ASYNC_WORKERS, thread_name_prefix="fires"
+    )
+
+
+def render_calculation(serializer, compress=False):
+    """
+    Render the data of a valid calculate serializer as JSON, from the cache
+    if the same input was calculated before (see FiresViewSet.cached_response),
+    optionally compressed.
+    """
+    return cache.load_content(
+        cache.calculate_key(serializer.validated_data),
+        lambda: FiresJSONRenderer().render(serializer.data),
+        compress,
+        local=serializer.is_calculated(),
+    )
+
+
+@transaction.non_atomic_requests
+async def calculate_async(request):
+    """
+    Async variant of FiresViewSet.calculate, for ASGI deployments (see
+    config/asgi.py). Accepts JSON or form data, and only renders JSON.
+
+    Input is validated on the event loop, but the CPU-bound calculation and
+    rendering are queued for calculation_executor. A worker process can then
+    keep many (slow) connections open, while only FIRES_ASYNC_WORKERS
+    calculations run at the same time.
+    """
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+
+    if request.content_type == "application/json":
+        try:
+            data = json.loads(request.body)
+        except ValueError as exc:
+            return JsonResponse(
+                {"detail": f"JSON parse error - {exc}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+    else:
+        data = request.POST
+
+    serializer = FiresCalculateSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    etag = cache.etag(serializer.validated_data)
+    if cache.is_not_modified(request, etag):
+        # Only GET (and HEAD) requests get a 304 (RFC 9110, 13.1.2)
+        return HttpResponse(status=status.HTTP_412_PRECONDITION_FAILED)
+
+    loop = asyncio.get_running_loop()
+    content = await loop.run_in_executor(
+        calculation_executor(),
+        render_calculation,
+        serializer,
+        compression.accepts(request),
+    )
+    response = HttpResponse(content, content_type="application/json")
+    response["ETag"] = etag
+    if compression.is_compressed(content):
+        compression.set_encoding(response)
+    return response
+
+
+# NOTE: Django (before 5.0) doesn't support the csrf_exempt decorator on async
+#       views, it would wrap the view in a sync function. Like the viewset (with
+#       AllowAny), the view doesn't depend on a session.
+calculate_async.csrf_exempt = True
@@ -1,5 +1,20 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 
 
 class FiresConfig(AppConfig):
     name = "fires_watch.fires"
+
+    def ready(self):
+        from fires_watch.fires.backends import BACKENDS
+        from fires_watch.fires.cache import compressed_cache
+        from fires_watch.fires.fires import result_cache
+
+        result_cache.max_bytes = settings.FIRES_RESULT_CACHE_BYTES
+        compressed_cache.max_bytes = settings.FIRES_COMPRESSED_CACHE_BYTES
+
+        if settings.FIRES_EXECUTION_BACKEND not in BACKENDS:
+            raise ImproperlyConfigured(
+                "FIRES_EXECUTION_BACKEND must be one of: " + ", ".join(BACKENDS)
+            )
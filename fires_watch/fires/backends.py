@@ -0,0 +1,92 @@
+import functools
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+
+
+class InlineBackend:
+    """Runs tasks one after the other, in the calling thread."""
+
+    def __init__(self, workers=1):
+        self.workers = 1
+
+    def map(self, function, *iterables):
+        """Call function with the items of iterables, returns the results."""
+        return list(map(function, *iterables))
+
+    def shutdown(self):
+        pass
+
+
+class PoolBackend:
+    """
+    Runs tasks in a pool of workers, which is started on first use and kept
+    for later tasks.
+    """
+
+    executor_class = ThreadPoolExecutor
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.executor = None
+        # Concurrent requests must not start a pool each
+        self.lock = threading.Lock()
+
+    def get_executor(self):
+        """The pool of workers, started if there is none yet."""
+        with self.lock:
+            if self.executor is None:
+                self.executor = self.executor_class(max_workers=self.workers)
+            return self.executor
+
+    def map(self, function, *iterables):
+        """Call function with the items of iterables, returns the results."""
+        return list(self.get_executor().map(function, *iterables))
+
+    def shutdown(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown()
+
+
+class ThreadBackend(PoolBackend):
+    """
+    Runs tasks in a pool of threads. Only gains from more workers when tasks
+    spend most time in numpy operations on large arrays, which release the
+    GIL.
+    """
+
+    executor_class = ThreadPoolExecutor
+
+
+class ProcessBackend(PoolBackend):
+    """
+    Runs tasks in a pool of processes, which are kept as long as the backend.
+
+    Tasks, their arguments and results are pickled, so functions must be
+    defined at module level, and arguments and results should be compact
+    (like numpy arrays). Workers import the module of a function once, so
+    tasks should only depend on numpy (like vectorized and montecarlo), and
+    don't set up Django.
+    """
+
+    executor_class = ProcessPoolExecutor
+
+
+BACKENDS = {
+    "inline": InlineBackend,
+    "thread": ThreadBackend,
+    "process": ProcessBackend,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def get_backend():
+    """
+    The backend configured by FIRES_EXECUTION_BACKEND (see BACKENDS), with
+    FIRES_EXECUTION_WORKERS workers, shared by all requests of a process.
+    """
+    backend = BACKENDS[settings.FIRES_EXECUTION_BACKEND]
+    return backend(settings.FIRES_EXECUTION_WORKERS)
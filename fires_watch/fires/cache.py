@@ -0,0 +1,183 @@
+import datetime
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import parse_etags, quote_etag
+
+from fires_watch.fires import compression
+from fires_watch.fires.fires import VERSION
+
+PREFIX = "fires:calculate"
+
+# Prefix of cached responses which only hold the result (see FiresV2ViewSet)
+RESULT_PREFIX = f"{PREFIX}:result"
+
+
+def digest(data):
+    """
+    Digest of a calculation, from its validated input.
+
+    The input is serialized canonically (sorted keys, no whitespace) and hashed
+    together with the calculation version and the current year, as the age in
+    the results depends on it.
+    """
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"))
+    year = datetime.date.today().year
+    return hashlib.sha256(f"{VERSION}:{year}:{canonical}".encode()).hexdigest()
+
+
+def calculate_key(data, prefix=PREFIX):
+    """Cache key of a calculation, from its validated input."""
+    return f"{prefix}:{digest(data)}"
+
+
+def etag(data):
+    """
+    Entity tag of a (JSON) calculate response, from its validated input. Like
+    the response, it only changes with the input, version or year.
+    """
+    return quote_etag(digest(data))
+
+
+def is_not_modified(request, etag):
+    """
+    Determine whether the client already has the response with the etag,
+    i.e. it matches If-None-Match (weakly, like Django's ConditionalGetMiddleware).
+    """
+    etags = parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))
+    return "*" in etags or etag in (
+        tag[2:] if tag.startswith("W/") else tag for tag in etags
+    )
+
+
+def not_modified_etag(request, etag, compress):
+    """
+    ETag of a 304 response: weak (see compression.set_encoding) if the
+    client has the compressed response, i.e. it accepts gzip and sent the
+    weak ETag.
+    """
+    etags = parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))
+    weak = f"W/{etag}"
+    return weak if compress and weak in etags else etag
+
+
+def max_age():
+    """
+    Seconds a calculate response may be cached by proxies: at most
+    FIRES_CALCULATE_MAX_AGE, and only until the year (and results) change.
+    """
+    now = datetime.datetime.now()
+    new_year = datetime.datetime(now.year + 1, 1, 1)
+    return min(settings.FIRES_CALCULATE_MAX_AGE, int((new_year - now).total_seconds()))
+
+
+def count(name, prefix=PREFIX):
+    """Increment a counter, shared by all workers using the same cache."""
+    key = f"{prefix}:{name}"
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add and incr, the count is lost
+        pass
+
+
+def load(key):
+    """Return cached content (or None), and count the hit or miss."""
+    content = cache.get(key)
+    count("misses" if content is None else "hits")
+    return content
+
+
+def store(key, content):
+    """Cache content for FIRES_CALCULATE_CACHE_TIMEOUT seconds."""
+    cache.set(key, content, timeout=settings.FIRES_CALCULATE_CACHE_TIMEOUT)
+
+
+class ContentCache:
+    """
+    Least recently used cache of response content (bytes), per worker
+    process, bounded by the total size of the content. Like ResultCache, it
+    is shared by the threads of a worker, so changes are made under a lock.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Return stored content, or None."""
+        with self.lock:
+            content = self.entries.get(key)
+            if content is not None:
+                self.entries.move_to_end(key)
+            return content
+
+    def put(self, key, content):
+        """Store content, evicting the least recently used if needed."""
+        if len(content) > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.bytes -= len(self.entries.pop(key))
+            self.entries[key] = content
+            self.bytes += len(content)
+            while self.bytes > self.max_bytes:
+                self.bytes -= len(self.entries.popitem(last=False)[1])
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+
+# Compressed calculate responses (see load_content), the size is configured by
+# the app (see apps.py)
+compressed_cache = ContentCache(max_bytes=8 * 2 ** 20)
+
+
+def load_content(key, render, compress, local=False):
+    """
+    Content of a calculate response, cached under key: rendered (by render),
+    and compressed for clients accepting gzip (see compression.compress).
+
+    Content is loaded from the shared cache, or rendered and stored there.
+    Results cached in this process (local, see fires.ResultCache) are
+    rendered without the shared cache instead, to skip the network round-trip.
+    Compressed content is also kept in this process (see compressed_cache),
+    so every worker compresses it once, and serves it without the shared cache.
+    """
+    if compress:
+        key = f"{key}:gzip"
+        content = compressed_cache.get(key)
+        if content is not None:
+            return content
+
+    content = None if local else load(key)
+    if content is None:
+        content = render()
+        if compress:
+            content = compression.compress(content)
+        if not local:
+            store(key, content)
+    if compress and settings.FIRES_CALCULATE_CACHE_TIMEOUT > 0:
+        compressed_cache.put(key, content)
+    return content
+
+
+def stats():
+    """Number of cache hits and misses, and the hit rate."""
+    hits = cache.get(f"{PREFIX}:hits", 0)
+    misses = cache.get(f"{PREFIX}:misses", 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / total if total else None,
+    }
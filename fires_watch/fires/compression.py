@@ -0,0 +1,83 @@
+import gzip
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+# Responses which are compressed (by CompressionMiddleware)
+URLS = re.compile(r"^/api/")
+
+# Like GZipMiddleware, quality values are ignored
+ACCEPTS_GZIP = re.compile(r"\bgzip\b")
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def accepts(request):
+    """Determine whether responses to a request are compressed."""
+    return settings.FIRES_COMPRESSION_LEVEL > 0 and bool(
+        ACCEPTS_GZIP.search(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+    )
+
+
+def compress(content):
+    """
+    Compress content of at least FIRES_COMPRESSION_MIN_SIZE bytes with gzip,
+    at FIRES_COMPRESSION_LEVEL. Other content, or content which doesn't get
+    smaller, is returned as is (see is_compressed).
+
+    Compression is deterministic (no timestamp), so equal content is
+    compressed to equal bytes.
+    """
+    if len(content) < settings.FIRES_COMPRESSION_MIN_SIZE:
+        return content
+    compressed = gzip.compress(
+        content, compresslevel=settings.FIRES_COMPRESSION_LEVEL, mtime=0
+    )
+    return compressed if len(compressed) < len(content) else content
+
+
+def is_compressed(content):
+    """Whether content was compressed by compress (JSON never starts so)."""
+    return content[:2] == GZIP_MAGIC
+
+
+def set_encoding(response):
+    """
+    Mark a response with compressed content, and weaken its ETag (like
+    GZipMiddleware), as it differs from the uncompressed response.
+    """
+    response["Content-Encoding"] = "gzip"
+    etag = response.get("ETag")
+    if etag and etag.startswith('"'):
+        response["ETag"] = f"W/{etag}"
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compresses API responses (see compress), for clients accepting gzip.
+
+    Responses which are already compressed, like calculate responses from
+    the cache (see FiresViewSet.cached_response), are left as they are, and
+    so are streaming responses.
+    """
+
+    def process_response(self, request, response):
+        if (
+            response.streaming
+            or settings.FIRES_COMPRESSION_LEVEL <= 0
+            or not URLS.match(request.path_info)
+        ):
+            return response
+
+        patch_vary_headers(response, ["Accept-Encoding"])
+        if response.has_header("Content-Encoding") or not accepts(request):
+            return response
+
+        content = compress(response.content)
+        if content is not response.content:
+            response.content = content
+            response["Content-Length"] = str(len(content))
+            set_encoding(response)
+        return response
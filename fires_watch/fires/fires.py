@@ -1,13 +1,31 @@
 import datetime
-from dataclasses import asdict, dataclass
-from typing import List
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+from typing import Dict, List, Union
+
+import numpy as np
+
+from fires_watch.fires import historical, montecarlo, rates, sampling, vectorized
+
+# Version of the calculation, bump it whenever results change (it is part of
+# the key of cached results).
+VERSION = 1
+
+# Values of each datapoint in the graph datasets
+MONTH_FIELDS = ("portfolio", "interest", "change")
+YEAR_FIELDS = ("year", "portfolio", "interest", "change")
+# Values of each datapoint in a downsampled monthly dataset (see Result)
+SAMPLED_MONTH_FIELDS = ("month",) + MONTH_FIELDS
 
 
 @dataclass
 class Result:
     """
     Contains all results we want to return.
-    Dataclass, so it can be converted into a dictionary for serializing.
+    Dataclass, so it can be converted into a dictionary for serializing
+    (see to_dict).
 
     At the moment retirement is reached, the following variables are recorded:
     - cost_of_living
@@ -15,26 +33,122 @@ class Result:
     - months
     - years
     - age
+
+    Graph data is stored as a list of datapoints (dicts), or when columnar,
+    as a dict with a list per value (see MONTH_FIELDS and YEAR_FIELDS).
+    With max_points, the graph data is downsampled to at most that many
+    datapoints per dataset while it is added, keeping the lowest and highest
+    portfolio of every stretch of months or years, and the moment of
+    retirement (see sampling.Sampler). Monthly datapoints then include their
+    month (see SAMPLED_MONTH_FIELDS).
+
+    Uses slots, as a Result is created for every calculation.
     """
 
+    __slots__ = (
+        "cost_of_living",
+        "portfolio",
+        "months",
+        "years",
+        "age",
+        "pension_started",
+        "graph_months",
+        "graph_years",
+        "samplers",
+    )
+
     cost_of_living: float
     portfolio: float
     months: int
     years: int
     age: int
     pension_started: bool
-    graph_months: List
-    graph_years: List
+    graph_months: Union[List, Dict]
+    graph_years: Union[List, Dict]
 
-    def __init__(self):
+    def __init__(self, columnar=False, max_points=None):
         self.cost_of_living = None
         self.portfolio = None
         self.months = None
         self.years = None
         self.age = None
         self.pension_started = False
-        self.graph_months = []
-        self.graph_years = []
+        if columnar:
+            self.graph_months = {field: [] for field in MONTH_FIELDS}
+            self.graph_years = {field: [] for field in YEAR_FIELDS}
+        else:
+            self.graph_months = []
+            self.graph_years = []
+        self.samplers = None
+        if max_points:
+            # Keyed on the portfolio, of a month and of a year
+            self.samplers = (
+                sampling.Sampler(max_points, key=0),
+                sampling.Sampler(max_points, key=1),
+            )
+
+    def to_dict(self):
+        """
+        Convert into a dictionary for serializing.
+
+        Unlike dataclasses.asdict, the graph data is not (deep) copied, but
+        handed over as is. The Result should not be used afterwards.
+        """
+        # Collect downsampled graph data (if any was added, unlike a summary)
+        if self.samplers is not None and self.samplers[0].count:
+            months, years = (sampler.points() for sampler in self.samplers)
+            self.set_graphs(
+                [
+                    [position + 1 for position, _ in months],
+                    *map(list, zip(*(values for _, values in months))),
+                ],
+                [list(values) for values in zip(*(values for _, values in years))]
+                or [[] for _ in YEAR_FIELDS],
+                month_fields=SAMPLED_MONTH_FIELDS,
+            )
+        self.samplers = None
+        return {field.name: getattr(self, field.name) for field in fields(self)}
+
+    def set_graphs(self, months, years, month_fields=MONTH_FIELDS):
+        """
+        Store all graph data at once, from a list of values per field (in the
+        order of month_fields and YEAR_FIELDS).
+        """
+        if isinstance(self.graph_months, dict):
+            self.graph_months = dict(zip(month_fields, months))
+            self.graph_years = dict(zip(YEAR_FIELDS, years))
+        else:
+            self.graph_months = [
+                dict(zip(month_fields, values)) for values in zip(*months)
+            ]
+            self.graph_years = [
+                dict(zip(YEAR_FIELDS, values)) for values in zip(*years)
+            ]
+
+    def add_month(self, values):
+        """Store the values of a month (in the order of MONTH_FIELDS)."""
+        if self.samplers is not None:
+            sampler = self.samplers[0]
+            sampler.add(values, pin=sampler.count + 1 == self.months)
+        elif isinstance(self.graph_months, dict):
+            for column, value in zip(self.graph_months.values(), values):
+                column.append(value)
+        else:
+            self.graph_months.append(dict(zip(MONTH_FIELDS, values)))
+
+    def add_year(self, values):
+        """Store the values of a year (in the order of YEAR_FIELDS)."""
+        if self.samplers is not None:
+            sampler = self.samplers[1]
+            retired = self.months is not None
+            sampler.add(
+                values, pin=retired and sampler.count == (self.months - 1) // 12
+            )
+        elif isinstance(self.graph_years, dict):
+            for column, value in zip(self.graph_years.values(), values):
+                column.append(value)
+        else:
+            self.graph_years.append(dict(zip(YEAR_FIELDS, values)))
 
 
 class UserInfo:
@@ -64,12 +178,12 @@ class UserInfo:
         self.monthly_income = self.yearly_income / 12
         self.monthly_expenses = data["expenses_per_year"] / 12
         self.monthly_savings = max(self.monthly_income - self.monthly_expenses, 0)
-        self.inflation_percent_monthly = (
-            1 + data["inflation_percentage_per_year"] / 100
-        ) ** (1 / 12)
-        self.portfolio_interest_percent_monthly = (
-            1 + data["portfolio_percentage_per_year"] / 100
-        ) ** (1 / 12)
+        self.inflation_percent_monthly = rates.monthly_factor(
+            data["inflation_percentage_per_year"]
+        )
+        self.portfolio_interest_percent_monthly = rates.monthly_factor(
+            data["portfolio_percentage_per_year"]
+        )
         self.safe_rate_yearly = data["max_withdrawal_percentage_per_year"] / 100
         self.current_year = datetime.date.today().year
 
@@ -83,7 +197,7 @@ class Calculator:
     monthly_interest: float
     monthly_savings: float
     target_portfolio: float
-    yearly_data: object
+    yearly_data: List
 
     def __init__(self, userinfo, result):
         """Set initial values"""
@@ -91,30 +205,27 @@ class Calculator:
         self.result = result
         self.month_count = 0
 
+    @classmethod
+    def batch(cls, userinfos, columnar=False, max_points=None):
+        """Initialize a calculator for each scenario."""
+        return [cls(userinfo, Result(columnar, max_points)) for userinfo in userinfos]
+
     def start_year(self):
         """Set yearly values to zero at the start of the year."""
-        self.yearly_data = {
-            "portfolio": 0,
-            "interest": 0,
-            "change": 0,
-        }
+        self.yearly_data = [0, 0, 0]
 
-    def generate_yearly_data(self, months):
-        """Save the yearly totals for further processing."""
+    def generate_yearly_values(self, months):
+        """Save the yearly totals for further processing (see YEAR_FIELDS)."""
 
         # NOTE: Yearly portfolio is added and divided by 12 to get the
         #       average portfolio size during the year.
 
-        return {
-            "year": months / 12,
-            "portfolio": self.yearly_data["portfolio"] // 12,
-            "interest": round(self.yearly_data["interest"]),
-            "change": round(self.yearly_data["change"]),
-        }
+        portfolio, interest, change = self.yearly_data
+        return (months / 12, portfolio // 12, round(interest), round(change))
 
-    def add_monthly_to_yearly_data(self, monthly_data):
-        for key, value in monthly_data.items():
-            self.yearly_data[key] += value
+    def add_monthly_to_yearly_data(self, monthly_values):
+        for index, value in enumerate(monthly_values):
+            self.yearly_data[index] += value
 
     def calculate_monthly_transactions(self):
         """
@@ -155,17 +266,17 @@ class Calculator:
             self.userinfo.monthly_expenses * 12 / self.userinfo.safe_rate_yearly
         )
 
-    def generate_monthly_data(self):
-        """Store monthly results for further processing."""
-        return {
-            "portfolio": round(self.userinfo.current_portfolio),
-            "interest": round(self.monthly_interest),
-            "change": round(
+    def generate_monthly_values(self):
+        """Store monthly results for further processing (see MONTH_FIELDS)."""
+        return (
+            round(self.userinfo.current_portfolio),
+            round(self.monthly_interest),
+            round(
                 -self.userinfo.monthly_expenses
                 if self.result.pension_started
                 else self.monthly_savings
             ),
-        }
+        )
 
     def is_retirement_goal_reached(self):
         """Determine if the target portfolio has been reached this month."""
@@ -197,6 +308,20 @@ class Calculator:
     def run(self):
         """Run monthly calculation for a set amount of cycles."""
 
+        for monthly_values, yearly_values in self.iterate():
+            self.result.add_month(monthly_values)
+            if yearly_values is not None:
+                self.result.add_year(yearly_values)
+
+    def iterate(self):
+        """
+        Run monthly calculation, yielding the graph data as it is calculated.
+
+        Yields the values of every month (see MONTH_FIELDS), together with
+        the values of the year at the end of a year (see YEAR_FIELDS), or
+        None. The retirement details are stored in the result.
+        """
+
         while self.month_count < 1200:
             # At the start of every year ..
             if (self.month_count % 12) == 0:
@@ -211,16 +336,17 @@ class Calculator:
                 # Save values from the first retirement month
                 self.calculate_retirement_values()
 
-            # Store this month's value as graph data
-            monthly_data = self.generate_monthly_data()
-            self.result.graph_months.append(monthly_data)
+            # Generate this month's value as graph data
+            monthly_values = self.generate_monthly_values()
 
-            # Add monthly values to year tally and store at end of year
-            self.add_monthly_to_yearly_data(monthly_data)
+            # Add monthly values to year tally and generate at end of year
+            self.add_monthly_to_yearly_data(monthly_values)
 
+            yearly_values = None
             if (self.month_count % 12) == 0:
-                yearly_data = self.generate_yearly_data(self.month_count)
-                self.result.graph_years.append(yearly_data)
+                yearly_values = self.generate_yearly_values(self.month_count)
+
+            yield monthly_values, yearly_values
 
             # Stop graph calculation after requested pension length
             if (
@@ -231,12 +357,373 @@ class Calculator:
                 break
 
     def results_as_dict(self):
-        return asdict(self.result)
+        return self.result.to_dict()
+
+
+def scenario_arrays(userinfos):
+    """Collect the initial values of many scenarios into arrays."""
+    return (
+        np.array([userinfo.initial_portfolio for userinfo in userinfos]),
+        np.array([userinfo.monthly_income for userinfo in userinfos]),
+        np.array([userinfo.monthly_expenses for userinfo in userinfos]),
+        np.array([userinfo.inflation_percent_monthly for userinfo in userinfos]),
+        np.array(
+            [userinfo.portfolio_interest_percent_monthly for userinfo in userinfos]
+        ),
+        np.array([userinfo.safe_rate_yearly for userinfo in userinfos]),
+    )
+
+
+def data_arrays(data):
+    """
+    Determine the initial values of UserInfo from user input, where any of the
+    values can be an array of scenarios (see UserInfo.__init__).
+    """
+    return (
+        np.asarray(data["portfolio_value"], dtype=float),
+        np.asarray(data["income_gross_per_year"]) / 12,
+        np.asarray(data["expenses_per_year"]) / 12,
+        rates.monthly_factors(data["inflation_percentage_per_year"]),
+        rates.monthly_factors(data["portfolio_percentage_per_year"]),
+        np.asarray(data["max_withdrawal_percentage_per_year"]) / 100,
+    )
+
+
+class VectorizedCalculator:
+    """
+    Calculates the same results as Calculator, but computes every month at
+    once using whole-array operations instead of stepping through them.
+
+    The series can be calculated for many scenarios at once (see batch), in
+    which case each calculator only reads its own row.
+    """
+
+    userinfo: UserInfo
+    result: Result
+    month_count: int
+    series: vectorized.Series
+    index: int
+
+    def __init__(self, userinfo, result, series=None, index=0):
+        """Set initial values"""
+        self.userinfo = userinfo
+        self.result = result
+        self.month_count = 0
+        self.series = series
+        self.index = index
+
+    @classmethod
+    def batch(cls, userinfos, columnar=False, max_points=None):
+        """Calculate the series of all scenarios in one pass."""
+        series = cls.calculate_series(userinfos)
+        return [
+            cls(userinfo, Result(columnar, max_points), series, index)
+            for index, userinfo in enumerate(userinfos)
+        ]
+
+    @staticmethod
+    def calculate_series(userinfos):
+        """Calculate the monthly series for all months in the horizon."""
+        return vectorized.simulate(*scenario_arrays(userinfos))
+
+    def calculate_retirement_values(self, month):
+        """Determines retirement age details, see Calculator."""
+        self.result.pension_started = True
+        self.result.months = month
+        self.result.years = month // 12
+        self.result.age = (
+            self.userinfo.current_year - self.userinfo.birth_year + month // 12
+        )
+        self.result.cost_of_living = round(
+            self.series.expenses[self.index, month - 1] * 12
+        )
+        self.result.portfolio = round(self.series.portfolio[self.index, month - 1])
+
+    def run(self):
+        """Run the calculation for all months at once."""
+        if self.series is None:
+            self.series = self.calculate_series([self.userinfo])
+
+        month = int(self.series.retirement_month[self.index])
+        if month:
+            self.calculate_retirement_values(month)
+            self.month_count = min(
+                month + 12 * self.userinfo.years_duration, vectorized.MONTHS
+            )
+        else:
+            self.month_count = vectorized.MONTHS
+
+        # Change is the savings until retirement, and the expenses after
+        count = self.month_count
+        expenses = self.series.expenses[self.index, :count]
+        savings = self.series.savings[self.index, :count]
+        retired = np.arange(count) >= month - 1 if month else np.zeros(count, bool)
+        portfolio = vectorized.rounded(self.series.portfolio[self.index, :count])
+        interest = vectorized.rounded(self.series.interest[self.index, :count])
+        change = vectorized.rounded(np.where(retired, -expenses, savings))
+        months = [portfolio, interest, change]
+
+        # Yearly totals (see Calculator.generate_yearly_values)
+        year_count = count // 12
+        portfolio, interest, change = (
+            values[: year_count * 12].reshape(year_count, 12).sum(axis=1)
+            for values in (portfolio, interest, change)
+        )
+        years = [
+            np.arange(1, year_count + 1, dtype=float),
+            portfolio // 12,
+            interest,
+            change,
+        ]
+
+        # Downsample to the same datapoints as Result does month by month
+        month_fields = MONTH_FIELDS
+        if self.result.samplers is not None:
+            max_points = self.result.samplers[0].max_points
+            kept = sampling.sample(months[0], max_points, month - 1 if month else None)
+            months = [kept + 1] + [values[kept] for values in months]
+            kept = sampling.sample(
+                years[1], max_points, (month - 1) // 12 if month else None
+            )
+            years = [values[kept] for values in years]
+            month_fields = SAMPLED_MONTH_FIELDS
+
+        self.result.set_graphs(
+            [values.tolist() for values in months],
+            [values.tolist() for values in years],
+            month_fields,
+        )
+
+    def results_as_dict(self):
+        return self.result.to_dict()
+
+
+class SummaryCalculator:
+    """
+    Calculates only the retirement details of Calculator (no graph data),
+    by solving for the retirement month instead of simulating every month.
+
+    Like VectorizedCalculator, many scenarios can be solved at once.
+    """
+
+    userinfo: UserInfo
+    result: Result
+    summary: vectorized.Summary
+    index: int
+
+    def __init__(self, userinfo, result, summary=None, index=0):
+        """Set initial values"""
+        self.userinfo = userinfo
+        self.result = result
+        self.summary = summary
+        self.index = index
+
+    @classmethod
+    def batch(cls, userinfos, columnar=False, max_points=None):
+        """Solve all scenarios in one pass."""
+        summary = cls.calculate_summary(userinfos)
+        return [
+            cls(userinfo, Result(columnar, max_points), summary, index)
+            for index, userinfo in enumerate(userinfos)
+        ]
+
+    @staticmethod
+    def calculate_summary(userinfos):
+        """Solve for the first month in which the target portfolio is reached."""
+        return vectorized.solve(*scenario_arrays(userinfos))
+
+    def run(self):
+        """Store the retirement details of the solved scenario."""
+        if self.summary is None:
+            self.summary = self.calculate_summary([self.userinfo])
+
+        month = int(self.summary.retirement_month[self.index])
+        if month:
+            self.result.pension_started = True
+            self.result.months = month
+            self.result.years = month // 12
+            self.result.age = (
+                self.userinfo.current_year - self.userinfo.birth_year + month // 12
+            )
+            self.result.cost_of_living = round(self.summary.expenses[self.index] * 12)
+            self.result.portfolio = round(self.summary.portfolio[self.index])
+
+    def results_as_dict(self):
+        return self.result.to_dict()
+
+
+# User input that can be used as an axis of a sweep (see Fires.sweep)
+SWEEP_FIELDS = [
+    "income_gross_per_year",
+    "expenses_per_year",
+    "portfolio_value",
+    "portfolio_percentage_per_year",
+    "inflation_percentage_per_year",
+    "max_withdrawal_percentage_per_year",
+]
+
+# Perturbation of every field for sensitivity analysis (see Fires.sensitivity):
+# a fraction of the value for amounts (rounded to a whole amount, at least 1),
+# percentage points for percentages
+SENSITIVITY_STEPS = {
+    "income_gross_per_year": 0.01,
+    "expenses_per_year": 0.01,
+    "portfolio_value": 0.01,
+    "portfolio_percentage_per_year": 0.1,
+    "inflation_percentage_per_year": 0.1,
+    "max_withdrawal_percentage_per_year": 0.1,
+}
+SENSITIVITY_AMOUNTS = ["income_gross_per_year", "expenses_per_year", "portfolio_value"]
+# Lowest and highest valid value of every field (as FiresInputSerializer
+# validates them, None: unbounded), which perturbations don't go beyond
+SENSITIVITY_BOUNDS = {
+    "income_gross_per_year": (1, None),
+    "expenses_per_year": (1, None),
+    "portfolio_value": (1, None),
+    "portfolio_percentage_per_year": (-100, 100),
+    "inflation_percentage_per_year": (-100, 100),
+    "max_withdrawal_percentage_per_year": (1, 10),
+}
+
+# Inputs that can be solved for (see Fires.goal_seek): lowest and highest value
+# (None: unbounded), and the precision of the solution
+GOAL_FIELDS = {
+    "expenses_per_year": (1, None, 1),
+    "income_gross_per_year": (1, None, 1),
+    "portfolio_value": (1, None, 1),
+    "portfolio_percentage_per_year": (-100, 100, 0.001),
+}
+# Values evaluated together in every iteration of the goal seek
+GOAL_POINTS = 32
+
+# Number of scenarios of a sweep calculated together (see Fires.sweep)
+SWEEP_CHUNK_SCENARIOS = 10000
+
+ENGINES = {
+    "iterative": Calculator,
+    "vectorized": VectorizedCalculator,
+    "summary": SummaryCalculator,
+}
+
+
+def graph_size(graph):
+    """
+    Estimate the memory used by a graph, a list of dicts with equal keys or
+    a (columnar) dict of lists.
+    """
+    size = sys.getsizeof(graph)
+    if isinstance(graph, dict):
+        for column in graph.values():
+            size += sys.getsizeof(column)
+            if column:
+                size += len(column) * sys.getsizeof(column[0])
+    elif graph:
+        item = graph[0]
+        size += len(graph) * (
+            sys.getsizeof(item) + sum(sys.getsizeof(value) for value in item.values())
+        )
+    return size
+
+
+class ResultCache:
+    """
+    Least recently used cache of calculation results, per worker process.
+
+    Unlike a cache bounded by the number of entries, it is bounded by the
+    (estimated) total size of the graph data of the stored results, as a
+    result with a full graph uses far more memory than a summary.
+
+    Results are returned as stored, callers must not modify them. The cache
+    is shared by the threads of a worker (e.g. of async views, see
+    calculation_executor), so changes are made under a lock.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(engine, columnar, userinfo, max_points=None):
+        """Key of a calculation, from the parsed user input."""
+        return (
+            engine,
+            columnar,
+            max_points,
+            userinfo.current_year,
+            userinfo.birth_year,
+            userinfo.years_duration,
+            userinfo.initial_portfolio,
+            userinfo.monthly_income,
+            userinfo.monthly_expenses,
+            userinfo.inflation_percent_monthly,
+            userinfo.portfolio_interest_percent_monthly,
+            userinfo.safe_rate_yearly,
+        )
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key):
+        """Return a stored result (or None), and count the hit or miss."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, result):
+        """Store a result, evicting the least recently used ones if needed."""
+        size = graph_size(result["graph_months"]) + graph_size(result["graph_years"])
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.bytes -= self.entries.pop(key)[1]
+            self.entries[key] = (result, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self.bytes -= self.entries.popitem(last=False)[1][1]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Number of entries, their size, and the hit rate."""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else None,
+        }
+
+
+# Results of Fires.calculate, the size is configured by the app (see apps.py)
+result_cache = ResultCache(max_bytes=32 * 1024 * 1024)
 
 
 class Fires:
     @staticmethod
-    def calculate(data):
+    def is_cached(data, engine="iterative", columnar=False, max_points=None):
+        """Determine whether the result of Fires.calculate is cached."""
+        key = ResultCache.key(engine, columnar, UserInfo(data), max_points)
+        return key in result_cache
+
+    @staticmethod
+    def calculate(data, engine="iterative", columnar=False, max_points=None):
         """
         Calculate monthly portfolio value by:
         - Adding savings ((income - expenses_per_year) / 12)
@@ -262,20 +749,360 @@ class Fires:
         - Total portfolio value
         - Total interest value
         - Total change (result of expenses, savings, withdrawal rate)
+
+        The engine selects the calculator (see ENGINES): "iterative" steps
+        through every month, "vectorized" computes all months at once, and
+        "summary" only solves for the retirement details (without graph data).
+
+        Columnar results hold the graph data as a list per value, instead of
+        a list of datapoints (see Result). With max_points, each dataset is
+        downsampled to at most that many datapoints as it is calculated.
+
+        Results are cached per worker process (see ResultCache), so they must
+        not be modified.
         """
 
-        # Initialize Result dataclass object
-        result = Result()
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown calculation engine: {engine}")
 
         # Parse user input
         userinfo = UserInfo(data)
 
+        # Return the result of an earlier calculation with the same input
+        key = ResultCache.key(engine, columnar, userinfo, max_points)
+        cached = result_cache.get(key)
+        if cached is not None:
+            return cached
+
+        # Initialize Result dataclass object
+        result = Result(columnar, max_points)
+
         # Initialize calculator
-        calculator = Calculator(userinfo, result)
+        calculator = ENGINES[engine](userinfo, result)
 
         # Run calculations and generate results
         calculator.run()
 
         # Convert Result() dataclass to a dictionary so it can be
         # serialized to JSON
-        return calculator.results_as_dict()
+        results = calculator.results_as_dict()
+        result_cache.put(key, results)
+        return results
+
+    @staticmethod
+    def stream(data):
+        """
+        Calculate the retirement details first, and the graph data as it is
+        needed.
+
+        Returns the result without graph data, and a generator of the monthly
+        datapoints (see Calculator.iterate). The result is found by
+        vectorized.march, which goes through the same floating point
+        operations as Calculator, without keeping any months. Months are only
+        calculated while the generator is consumed, and are not kept.
+        """
+
+        userinfo = UserInfo(data)
+        summary = vectorized.march(*scenario_arrays([userinfo]))
+        calculator = SummaryCalculator(userinfo, Result(), summary)
+        calculator.run()
+
+        months = (
+            dict(zip(MONTH_FIELDS, monthly_values))
+            for monthly_values, _ in Calculator(UserInfo(data), Result()).iterate()
+        )
+        return calculator.results_as_dict(), months
+
+    @staticmethod
+    def calculate_many(data_list, engine="vectorized", columnar=False, max_points=None):
+        """
+        Calculate many scenarios, see Fires.calculate.
+
+        Returns the results in the same order as the given data. The
+        "vectorized" and "summary" engines calculate all scenarios together
+        in a single pass, instead of one by one.
+        """
+
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown calculation engine: {engine}")
+
+        # Parse user input and initialize calculators
+        userinfos = [UserInfo(data) for data in data_list]
+        calculators = ENGINES[engine].batch(userinfos, columnar, max_points)
+
+        results = []
+        for calculator in calculators:
+            calculator.run()
+            results.append(calculator.results_as_dict())
+        return results
+
+    @staticmethod
+    def sweep(data, x, y, backend=None):
+        """
+        Calculate the retirement month and age for a grid of scenarios.
+
+        The axes x and y each sweep one field of the user input (see
+        SWEEP_FIELDS) over `steps` evenly spaced values from `start` through
+        `stop`, all other fields are taken from data. The grid is calculated
+        in chunks of rows (see vectorized.march), not scenario by scenario.
+        Chunks are calculated by the backend (see backends.BACKENDS), or one by
+        one if none is given.
+
+        Returned grids are indexed as [x][y], with None for scenarios that
+        never reach the retirement goal.
+        """
+
+        x_values = np.linspace(x["start"], x["stop"], x["steps"])
+        y_values = np.linspace(y["start"], y["stop"], y["steps"])
+        grid = {
+            **data,
+            x["field"]: x_values.reshape(-1, 1),
+            y["field"]: y_values.reshape(1, -1),
+        }
+
+        # Rows of at least SWEEP_CHUNK_SCENARIOS scenarios (if possible)
+        arrays = np.broadcast_arrays(*data_arrays(grid))
+        rows = max(SWEEP_CHUNK_SCENARIOS // len(y_values), 1)
+        chunks = [slice(row, row + rows) for row in range(0, len(x_values), rows)]
+        summaries = (map if backend is None else backend.map)(
+            vectorized.march, *([array[chunk] for chunk in chunks] for array in arrays)
+        )
+
+        current_year = datetime.date.today().year
+        months = np.concatenate(
+            [summary.retirement_month for summary in summaries]
+        ).tolist()
+        return {
+            "x": {"field": x["field"], "values": x_values.tolist()},
+            "y": {"field": y["field"], "values": y_values.tolist()},
+            "months": [[month or None for month in row] for row in months],
+            "age": [
+                [
+                    current_year - data["birth_year"] + month // 12 if month else None
+                    for month in row
+                ]
+                for row in months
+            ],
+        }
+
+    @staticmethod
+    def sensitivity(data):
+        """
+        Determine the change in retirement month per unit change of every
+        field of SENSITIVITY_STEPS.
+
+        Every field is perturbed by its step in both directions, the change is
+        the difference in retirement month divided by the difference in value
+        (central difference). Values are not perturbed beyond the bounds of
+        the field (see SENSITIVITY_BOUNDS), where they would be invalid input.
+        All perturbed scenarios are solved together (see vectorized.solve), not scenario by scenario.
+
+        Returned, per field:
+        - Step, and the values below and above the user input
+        - Retirement months at those values (None if never reached)
+        - Change in retirement month per unit (None if never reached at
+          either value)
+        """
+
+        fields = list(SENSITIVITY_STEPS)
+        scenarios = {field: [data[field]] for field in fields}
+        perturbed = {}
+        for field in fields:
+            value = data[field]
+            step = SENSITIVITY_STEPS[field]
+            if field in SENSITIVITY_AMOUNTS:
+                # Amounts are whole numbers
+                step = max(round(step * value), 1)
+            lowest, highest = SENSITIVITY_BOUNDS[field]
+            low = max(value - step, lowest)
+            high = value + step if highest is None else min(value + step, highest)
+            perturbed[field] = (step, low, high)
+            for other in fields:
+                scenarios[other].extend(
+                    [low, high] if other == field else [data[other]] * 2
+                )
+
+        grid = {**data, **{field: np.array(scenarios[field]) for field in fields}}
+        months = vectorized.solve(*data_arrays(grid)).retirement_month.tolist()
+
+        result = {"months": months[0] or None, "fields": {}}
+        for index, field in enumerate(fields):
+            step, low, high = perturbed[field]
+            below, above = months[2 * index + 1], months[2 * index + 2]
+            result["fields"][field] = {
+                "step": step,
+                "values": [low, high],
+                "months": [below or None, above or None],
+                "months_per_unit": (
+                    (above - below) / (high - low) if below and above else None
+                ),
+            }
+        return result
+
+    @staticmethod
+    def goal_seek(data, field, months):
+        """
+        Solve for the value of one field of the user input (see GOAL_FIELDS)
+        with which retirement is reached within the given number of months.
+
+        The retirement month only improves with higher values (or lower
+        expenses), so the solution is the lowest value (highest expenses)
+        that reaches the target. It is first bracketed, between the bounds of
+        the field (or doubling values for unbounded amounts), and the bracket
+        is then narrowed down until it is within the precision of the field.
+        Every iteration evaluates GOAL_POINTS values of the bracket together
+        (see vectorized.solve), which shrinks it GOAL_POINTS + 1 times.
+
+        Returned:
+        - Solved value (None if the target can't be reached)
+        - Retirement month and age with the solved value
+        - Number of iterations, and of evaluated scenarios
+        """
+
+        lowest, highest, precision = GOAL_FIELDS[field]
+        # Whether higher values of the field result in earlier retirement
+        rising = field != "expenses_per_year"
+        evaluations = 0
+
+        def evaluate(values):
+            nonlocal evaluations
+            evaluations += len(values)
+            grid = {**data, field: values}
+            solved = vectorized.solve(*data_arrays(grid)).retirement_month
+            return solved, (solved > 0) & (solved <= months)
+
+        # Bracket the solution
+        if highest is None:
+            values = lowest * 2.0 ** np.arange(GOAL_POINTS * 2)
+        else:
+            values = np.linspace(lowest, highest, GOAL_POINTS + 2)
+        solved, reached = evaluate(values)
+        iterations = 1
+
+        if not reached.any():
+            good, bad, month = None, None, None
+        else:
+            index = (
+                reached.argmax()
+                if rising
+                else len(reached) - 1 - reached[::-1].argmax()
+            )
+            good, month = values[index], solved[index]
+            bad = None
+            if rising and index > 0:
+                bad = values[index - 1]
+            if not rising and index < len(values) - 1:
+                bad = values[index + 1]
+
+        # Narrow down the bracket, good always reaches the target, bad doesn't
+        while bad is not None and abs(good - bad) > precision:
+            values = np.linspace(min(good, bad), max(good, bad), GOAL_POINTS + 2)
+            if precision >= 1:
+                values = np.unique(np.round(values))
+            values = values[1:-1]
+            if not len(values):
+                break
+            solved, reached = evaluate(values)
+            iterations += 1
+
+            if rising:
+                # Lowest value that reaches the target
+                if reached.any():
+                    index = reached.argmax()
+                    good, month = values[index], solved[index]
+                    bad = values[index - 1] if index > 0 else bad
+                else:
+                    bad = values[-1]
+            else:
+                # Highest value that reaches the target
+                if reached.any():
+                    index = len(reached) - 1 - reached[::-1].argmax()
+                    good, month = values[index], solved[index]
+                    bad = values[index + 1] if index < len(values) - 1 else bad
+                else:
+                    bad = values[0]
+
+        if good is not None:
+            good = int(good) if precision >= 1 else float(good)
+            month = int(month)
+        current_year = datetime.date.today().year
+        return {
+            "field": field,
+            "value": good,
+            "months": month,
+            "age": current_year - data["birth_year"] + month // 12 if month else None,
+            "iterations": iterations,
+            "evaluations": evaluations,
+        }
+
+    @staticmethod
+    def monte_carlo(
+        data,
+        paths,
+        seed=None,
+        return_std=15,
+        inflation_std=1,
+        distribution="normal",
+        backend=None,
+    ):
+        """
+        Simulate random paths of portfolio returns and inflation.
+
+        Instead of constant yearly percentages, returns and inflation are
+        drawn from a distribution (see montecarlo.DISTRIBUTIONS) with the
+        user's percentages as mean, and the given standard deviations.
+
+        Returned (see montecarlo.simulate):
+        - Probability of reaching the retirement goal
+        - Retirement month percentiles (5, 50, 95)
+        - Yearly portfolio percentile bands (5, 50, 95)
+
+        Chunks of paths are simulated by the backend (see backends.BACKENDS),
+        or one by one if none is given.
+        """
+
+        # Parse user input
+        userinfo = UserInfo(data)
+
+        scenario = {
+            "initial_portfolio": userinfo.initial_portfolio,
+            "monthly_income": userinfo.monthly_income,
+            "monthly_expenses": userinfo.monthly_expenses,
+            "safe_rate": userinfo.safe_rate_yearly,
+            "distribution": distribution,
+            "return_mean": data["portfolio_percentage_per_year"],
+            "return_std": return_std,
+            "inflation_mean": data["inflation_percentage_per_year"],
+            "inflation_std": inflation_std,
+        }
+        return montecarlo.simulate(scenario, paths, seed=seed, backend=backend)
+
+    @staticmethod
+    def backtest(data, path):
+        """
+        Replay the historical dataset (see historical.load) at path.
+
+        Instead of constant yearly percentages, every start month of the
+        dataset is replayed with the historical returns and inflation that
+        followed it. All start months are evaluated together.
+
+        Returned (see historical.summarize):
+        - Number and range of start months (windows)
+        - Distribution of retirement months
+        - Number of windows in which the portfolio was depleted during
+          retirement, and the worst window
+        """
+
+        # Parse user input
+        userinfo = UserInfo(data)
+
+        dataset = historical.load(path)
+        results = historical.backtest(
+            dataset,
+            userinfo.initial_portfolio,
+            userinfo.monthly_income,
+            userinfo.monthly_expenses,
+            userinfo.safe_rate_yearly,
+            userinfo.years_duration,
+        )
+        return historical.summarize(dataset, *results)
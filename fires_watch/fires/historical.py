@@ -0,0 +1,190 @@
+import functools
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from fires_watch.fires import vectorized
+
+# Binary layout of a historical dataset:
+# - Header: magic, format version, year and month of the first month, and
+#   the number of months (little-endian)
+# - Monthly total return factors of equities (1 + return), as float64
+# - Monthly consumer price index levels, as float64
+HEADER = struct.Struct("<4sHHHI")
+MAGIC = b"FWHD"
+VERSION = 1
+
+
+@dataclass
+class Dataset:
+    """Monthly historical series, starting at (year, month)."""
+
+    year: int
+    month: int
+    returns: np.ndarray
+    cpi: np.ndarray
+
+    def date(self, index):
+        """Year and month (as 'YYYY-MM') of the month at index."""
+        year, month = divmod(self.month - 1 + index, 12)
+        return f"{self.year + year:04d}-{month + 1:02d}"
+
+
+def write(path, year, month, returns, cpi):
+    """
+    Write monthly return factors and CPI levels as a dataset file (creating
+    its directory if needed).
+    """
+    returns = np.asarray(returns, dtype="<f8")
+    cpi = np.asarray(cpi, dtype="<f8")
+    if returns.shape != cpi.shape or returns.ndim != 1:
+        raise ValueError("Returns and CPI must be series of the same length")
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, year, month, len(returns)))
+        file.write(returns.tobytes())
+        file.write(cpi.tobytes())
+
+
+@functools.lru_cache(maxsize=None)
+def load(path):
+    """
+    Memory-map a dataset file.
+
+    The mapping is cached, so every worker process maps the file once and
+    shares it between requests (and with other processes, via the page cache).
+    """
+    with open(path, "rb") as file:
+        magic, version, year, month, count = HEADER.unpack(file.read(HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a historical dataset (version {VERSION}): {path}")
+
+    data = np.memmap(path, dtype="<f8", mode="r", offset=HEADER.size, shape=(2, count))
+    return Dataset(year=year, month=month, returns=data[0], cpi=data[1])
+
+
+def backtest(
+    dataset,
+    initial_portfolio,
+    monthly_income,
+    monthly_expenses,
+    safe_rate,
+    years_duration,
+    months=vectorized.MONTHS,
+):
+    """
+    Replay every start month of the dataset as a separate scenario.
+
+    Every window steps through the historical returns and inflation (from the
+    CPI) after its start month, like Calculator does with constant rates. All
+    windows are evaluated together, one month at a time. After retirement,
+    the inflation adjusted expenses are withdrawn from the portfolio for the
+    duration of the retirement, to find the windows in which it is depleted.
+
+    Windows run until the data ends, so late windows may not reach
+    retirement, or not complete their retirement, within the data.
+
+    Returns arrays per window:
+    - Retirement month (0 if not reached within the data)
+    - Lowest portfolio during retirement, relative to the portfolio at
+      retirement (NaN if retirement was not completed within the data)
+    - Month of retirement in which the portfolio was depleted (0 if never)
+    """
+    count = len(dataset.returns) - 1
+    starts = np.arange(count)
+    duration = 12 * years_duration
+
+    # Month m of the window starting at s uses the data of month s + m, with
+    # the inflation factor following from the consecutive CPI levels.
+    returns = np.asarray(dataset.returns[1:])
+    inflation = np.asarray(dataset.cpi[1:]) / np.asarray(dataset.cpi[:-1])
+
+    portfolio = np.full(count, float(initial_portfolio))
+    expenses = np.full(count, float(monthly_expenses))
+    retirement_month = np.zeros(count, dtype=int)
+    retirement_portfolio = np.full(count, np.nan)
+    lowest_portfolio = np.full(count, np.inf)
+    depleted_month = np.zeros(count, dtype=int)
+
+    for month in range(1, months + duration + 1):
+        # Every window reads the data of its own month (if there is any)
+        index = starts + month
+        active = (
+            (index <= count)
+            & (depleted_month == 0)
+            & ((retirement_month == 0) | (month <= retirement_month + duration))
+        )
+        if month > months:
+            active &= retirement_month > 0
+        if not active.any():
+            break
+        index = np.minimum(index, count) - 1
+
+        retired = active & (retirement_month > 0)
+        saving = active & ~retired
+        expenses[active] *= inflation[index[active]]
+        portfolio[active] *= returns[index[active]]
+        portfolio[saving] += np.maximum(monthly_income - expenses[saving], 0)
+        portfolio[retired] -= expenses[retired]
+
+        # Record the first month of depletion, and the lowest portfolio
+        depleted = retired & (portfolio <= 0) & (depleted_month == 0)
+        depleted_month[depleted] = month - retirement_month[depleted]
+        lowest_portfolio[retired] = np.minimum(
+            lowest_portfolio[retired], portfolio[retired]
+        )
+
+        reached = saving & (portfolio > expenses * 12 / safe_rate)
+        retirement_month[reached] = month
+        retirement_portfolio[reached] = portfolio[reached]
+
+    # Only windows with a full retirement within the data (or depleted before
+    # the data ends) count for depletion.
+    completed = (retirement_month > 0) & (
+        (starts + retirement_month + duration <= count) | (depleted_month > 0)
+    )
+    with np.errstate(invalid="ignore"):
+        lowest = np.where(completed, lowest_portfolio / retirement_portfolio, np.nan)
+    return retirement_month, lowest, np.where(completed, depleted_month, 0)
+
+
+def summarize(dataset, retirement_month, lowest, depleted_month):
+    """Distribution of retirement months, and the worst case of depletion."""
+    retired = retirement_month[retirement_month > 0]
+    completed = ~np.isnan(lowest)
+    summary = {
+        "windows": len(retirement_month),
+        "first_start": dataset.date(0),
+        "last_start": dataset.date(len(retirement_month) - 1),
+        "retired": len(retired),
+        "months": None,
+        "completed": int(completed.sum()),
+        "depleted": int((depleted_month > 0).sum()),
+        "worst": None,
+    }
+    if len(retired):
+        p5, p50, p95 = np.percentile(retired, [5, 50, 95]).tolist()
+        summary["months"] = {
+            "min": int(retired.min()),
+            "p5": round(p5),
+            "p50": round(p50),
+            "p95": round(p95),
+            "max": int(retired.max()),
+        }
+    if completed.any():
+        # The worst window is depleted soonest, or otherwise dropped lowest
+        if summary["depleted"]:
+            months = np.where(depleted_month > 0, depleted_month, np.iinfo(int).max)
+            start = int(months.argmin())
+        else:
+            start = int(np.where(completed, lowest, np.inf).argmin())
+        summary["worst"] = {
+            "start": dataset.date(start),
+            "retirement_month": int(retirement_month[start]),
+            "depleted_month": int(depleted_month[start]) or None,
+            "lowest_portfolio_ratio": float(lowest[start]),
+        }
+    return summary
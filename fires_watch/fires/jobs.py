@@ -0,0 +1,298 @@
+import collections
+import functools
+import json
+import logging
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+from fires_watch.fires import cache as counters
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "fires:jobs"
+
+# Calculations that can be queued as a job, by the serializer calculating them
+# (imported when needed, as the serializers validate jobs with this module)
+JOB_KINDS = {
+    "monte_carlo": "fires_watch.fires.api.serializers.FiresMonteCarloJobSerializer",
+    "sweep": "fires_watch.fires.api.serializers.FiresSweepSerializer",
+}
+
+# Number of most recent jobs the latency metrics are based on
+LATENCY_SAMPLES = 1000
+
+# Job fields returned by the API (the input is only kept for the worker)
+FIELDS = ["id", "kind", "status", "submitted", "started", "finished", "error"]
+
+
+@functools.lru_cache(maxsize=None)
+def job_serializer(kind):
+    """Serializer class calculating a kind of job (see JOB_KINDS)."""
+    return import_string(JOB_KINDS[kind])
+
+
+def run(kind, data):
+    """Calculate the result of a job, from its (validated) input."""
+    serializer = job_serializer(kind)(data=data)
+    serializer.is_valid(raise_exception=True)
+    return serializer.data
+
+
+def percentiles(values):
+    """Mean, median, 95th percentile and maximum of values (or None)."""
+    if not values:
+        return None
+    values = sorted(values)
+    return {
+        "mean": sum(values) / len(values),
+        "p50": values[(len(values) - 1) // 2],
+        "p95": values[max(round(0.95 * len(values)) - 1, 0)],
+        "max": values[-1],
+    }
+
+
+class JobQueue:
+    """
+    Queue of calculations, run by workers outside of the request cycle.
+
+    Jobs are stored in the cache (for FIRES_JOB_TIMEOUT seconds), the queue
+    itself holds their ids. Subclasses implement the queue (push, pop and
+    depth) and keep the latencies of recent jobs.
+    """
+
+    @staticmethod
+    def key(job_id):
+        return f"{PREFIX}:{job_id}"
+
+    def get(self, job_id):
+        """Return a job, or None if it doesn't exist (anymore)."""
+        return cache.get(self.key(job_id))
+
+    def save(self, job):
+        cache.set(self.key(job["id"]), job, timeout=settings.FIRES_JOB_TIMEOUT)
+
+    def submit(self, kind, data):
+        """Queue a calculation, and return the job."""
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": "queued",
+            "submitted": time.time(),
+            "started": None,
+            "finished": None,
+            "input": data,
+            "result": None,
+            "error": None,
+        }
+        self.save(job)
+        self.push(job["id"])
+        counters.count("submitted", prefix=PREFIX)
+        return job
+
+    def process(self, job_id):
+        """Run a queued job, and store its result (or error)."""
+        job = self.get(job_id)
+        if job is None:
+            # Expired while queued
+            return None
+
+        job["status"] = "running"
+        job["started"] = time.time()
+        self.save(job)
+        try:
+            job["result"] = run(job["kind"], job["input"])
+            job["status"] = "done"
+        except Exception as exc:
+            logger.exception("Job %s failed", job_id)
+            job["status"] = "failed"
+            job["error"] = str(exc)
+        job["finished"] = time.time()
+        self.save(job)
+
+        counters.count(job["status"], prefix=PREFIX)
+        self.record_latency(
+            job["started"] - job["submitted"], job["finished"] - job["started"]
+        )
+        return job
+
+    def work(self, burst=False, timeout=5):
+        """
+        Process jobs as they are queued. In burst mode, stop when the queue
+        is empty.
+        """
+        while True:
+            job_id = self.pop(timeout)
+            if job_id is not None:
+                self.process(job_id)
+            elif burst:
+                return
+
+    def metrics(self):
+        """
+        Queue depth, number of jobs per status, and the latencies of recent
+        jobs (seconds): waiting in the queue, and running.
+        """
+        latencies = self.latencies()
+        return {
+            "depth": self.depth(),
+            **{
+                status: cache.get(f"{PREFIX}:{status}", 0)
+                for status in ["submitted", "done", "failed"]
+            },
+            "wait": percentiles([wait for wait, _ in latencies]),
+            "run": percentiles([run for _, run in latencies]),
+        }
+
+    def push(self, job_id):
+        raise NotImplementedError
+
+    def pop(self, timeout):
+        """Take the next job id, waiting at most timeout seconds (or None)."""
+        raise NotImplementedError
+
+    def depth(self):
+        """Number of queued jobs."""
+        raise NotImplementedError
+
+    def record_latency(self, wait, run):
+        raise NotImplementedError
+
+    def latencies(self):
+        """Wait and run time of the most recent jobs."""
+        raise NotImplementedError
+
+
+class RedisQueue(JobQueue):
+    """
+    Queue in Redis (the connection of the django-redis cache), shared by all
+    processes. Run workers with the run_jobs management command.
+    """
+
+    def __init__(self):
+        from django_redis import get_redis_connection
+
+        self.redis = get_redis_connection("default")
+
+    def push(self, job_id):
+        self.redis.lpush(f"{PREFIX}:queue", job_id)
+
+    def pop(self, timeout):
+        item = self.redis.brpop(f"{PREFIX}:queue", timeout=timeout)
+        return item[1].decode() if item else None
+
+    def depth(self):
+        return self.redis.llen(f"{PREFIX}:queue")
+
+    def record_latency(self, wait, run):
+        key = f"{PREFIX}:latency"
+        pipeline = self.redis.pipeline()
+        pipeline.lpush(key, json.dumps([wait, run]))
+        pipeline.ltrim(key, 0, LATENCY_SAMPLES - 1)
+        pipeline.execute()
+
+    def latencies(self):
+        items = self.redis.lrange(f"{PREFIX}:latency", 0, -1)
+        return [json.loads(item) for item in items]
+
+
+class LocalQueue(JobQueue):
+    """
+    Queue in this process, as a stand-in for RedisQueue (without Redis, and
+    in tests). Jobs are processed by a thread, started on the first job.
+    """
+
+    def __init__(self):
+        self.queue = collections.deque()
+        self.samples = collections.deque(maxlen=LATENCY_SAMPLES)
+        self.condition = threading.Condition()
+        self.unfinished = 0
+        self.worker = None
+
+    def push(self, job_id):
+        with self.condition:
+            self.queue.append(job_id)
+            self.unfinished += 1
+            self.condition.notify_all()
+            if self.worker is None:
+                self.worker = threading.Thread(
+                    target=self.work, name="fires-jobs", daemon=True
+                )
+                self.worker.start()
+
+    def pop(self, timeout):
+        with self.condition:
+            self.condition.wait_for(lambda: self.queue, timeout=timeout)
+            return self.queue.popleft() if self.queue else None
+
+    def process(self, job_id):
+        try:
+            return super().process(job_id)
+        finally:
+            with self.condition:
+                self.unfinished -= 1
+                self.condition.notify_all()
+
+    def join(self, timeout=None):
+        """Wait until all queued jobs are processed."""
+        with self.condition:
+            return self.condition.wait_for(lambda: not self.unfinished, timeout)
+
+    def depth(self):
+        return len(self.queue)
+
+    def record_latency(self, wait, run):
+        self.samples.append((wait, run))
+
+    def latencies(self):
+        return list(self.samples)
+
+
+@functools.lru_cache(maxsize=None)
+def get_queue():
+    """
+    The queue of this process: in Redis when it is the cache (see
+    production.py), otherwise in this process.
+    """
+    if settings.CACHES["default"]["BACKEND"].startswith("django_redis."):
+        return RedisQueue()
+    return LocalQueue()
+
+
+def public(job, result=True):
+    """The fields of a job returned by the API, optionally with the result."""
+    data = {field: job[field] for field in FIELDS}
+    if result:
+        data["result"] = job["result"]
+    return data
+
+
+def updates(job_id, interval=0.5, duration=None):
+    """
+    Generate the state of a job whenever its status changes, until it is
+    finished (the result is only included then) or duration seconds passed
+    (default: FIRES_JOB_STREAM_DURATION).
+
+    The generator holds a (sync) worker while it runs, so the duration is
+    kept short, clients then poll the job or stream again.
+    """
+    if duration is None:
+        duration = settings.FIRES_JOB_STREAM_DURATION
+    queue = get_queue()
+    status = None
+    deadline = time.monotonic() + duration
+    while True:
+        job = queue.get(job_id)
+        if job is None:
+            return
+        finished = job["status"] in ["done", "failed"]
+        if job["status"] != status:
+            status = job["status"]
+            yield public(job, result=finished)
+        if finished or time.monotonic() >= deadline:
+            return
+        time.sleep(interval)
@@ -0,0 +1,347 @@
+import json
+import platform
+import statistics
+import timeit
+import tracemalloc
+from dataclasses import asdict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from fires_watch.fires.api.renderers import ENCODERS
+from fires_watch.fires.api.serializers import FiresCalculateSerializer
+from fires_watch.fires.backends import BACKENDS
+from fires_watch.fires.fires import (
+    VERSION,
+    Calculator,
+    Fires,
+    Result,
+    UserInfo,
+    result_cache,
+)
+
+BASELINE = Path(__file__).resolve().parents[2] / "benchmarks" / "baseline.json"
+
+PAYLOAD = {
+    "birth_year": 1984,
+    "years_duration": 30,
+    "currency": "EUR",
+    "income_gross_per_year": 50000,
+    "expenses_per_year": 25000,
+    "portfolio_value": 100000,
+    "portfolio_percentage_per_year": 10,
+    "inflation_percentage_per_year": 2,
+    "max_withdrawal_percentage_per_year": 4,
+}
+
+# Input profiles, by the month in which they retire
+PROFILES = {
+    "month_1": {**PAYLOAD, "portfolio_value": 10000000},
+    "month_141": PAYLOAD,
+    "never": {
+        **PAYLOAD,
+        "income_gross_per_year": 30000,
+        "expenses_per_year": 30000,
+        "portfolio_value": 1,
+        "portfolio_percentage_per_year": 0,
+    },
+}
+
+
+def run_calculator(payload):
+    Calculator(UserInfo(payload), Result()).run()
+
+
+def calculate(payload):
+    Fires.calculate(payload)
+
+
+def serialize(payload):
+    serializer = FiresCalculateSerializer(data=payload)
+    serializer.is_valid(raise_exception=True)
+    return serializer.data
+
+
+client = Client()
+
+
+def request(payload):
+    response = client.post(reverse("api:fires-calculate"), payload)
+    if response.status_code != 200:
+        raise CommandError(f"Request failed with status {response.status_code}")
+
+
+# Layers, from the calculation alone up to the full request
+LAYERS = {
+    "run": run_calculator,
+    "calculate": calculate,
+    "serializer": serialize,
+    "request": request,
+}
+
+
+def measure(function, payload, number, repeat):
+    """
+    Time a function (seconds per call, median and minimum over the repeats),
+    and the peak memory (bytes) allocated by a single call.
+    """
+    function(payload)  # warm up
+    timings = [
+        time / number
+        for time in timeit.repeat(
+            lambda: function(payload), number=number, repeat=repeat
+        )
+    ]
+    tracemalloc.start()
+    function(payload)
+    allocated = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "median": statistics.median(timings),
+        "min": min(timings),
+        "allocated": allocated,
+    }
+
+
+# Conversions of a calculated result for serializing: a deep copy (as
+# dataclasses.asdict did before Result.to_dict), or handing the graph data over
+CONVERSIONS = {
+    "asdict": asdict,
+    "to_dict": Result.to_dict,
+}
+
+
+def measure_conversions(profiles, number, repeat):
+    """
+    Time and peak memory of every conversion (see CONVERSIONS and measure),
+    of the result of every profile.
+    """
+    results = {}
+    for profile in profiles:
+        calculator = Calculator(UserInfo(PROFILES[profile]), Result())
+        calculator.run()
+        results[profile] = {
+            name: measure(convert, calculator.result, number, repeat)
+            for name, convert in CONVERSIONS.items()
+        }
+    return results
+
+
+# Heavy calculations run by an execution backend, and their number of scenarios
+MONTE_CARLO_PATHS = 50000
+SWEEP_STEPS = 200
+SWEEP_X = {"field": "portfolio_percentage_per_year", "start": -10, "stop": 20}
+SWEEP_Y = {"field": "inflation_percentage_per_year", "start": -5, "stop": 15}
+TASKS = {
+    "monte_carlo": (
+        lambda backend: Fires.monte_carlo(
+            PAYLOAD, MONTE_CARLO_PATHS, seed=1, backend=backend
+        ),
+        MONTE_CARLO_PATHS,
+    ),
+    "sweep": (
+        lambda backend: Fires.sweep(
+            PAYLOAD,
+            {**SWEEP_X, "steps": SWEEP_STEPS},
+            {**SWEEP_Y, "steps": SWEEP_STEPS},
+            backend=backend,
+        ),
+        SWEEP_STEPS ** 2,
+    ),
+}
+
+
+def measure_backend(name, workers, repeat):
+    """Throughput (scenarios per second, best of the repeats) of every task."""
+    backend = BACKENDS[name](workers)
+    try:
+        results = {}
+        for task, (function, scenarios) in TASKS.items():
+            function(backend)  # warm up (and start the workers)
+            time = min(
+                timeit.repeat(lambda: function(backend), number=1, repeat=repeat)
+            )
+            results[task] = scenarios / time
+        return results
+    finally:
+        backend.shutdown()
+
+
+def measure_renderers(number, repeat):
+    """
+    Time (seconds per call, best of the repeats) of every installed JSON
+    encoder (see renderers.ENCODERS), for a response with graph data in both
+    formats.
+    """
+    responses = {
+        graph_format: serialize({**PAYLOAD, "graph_format": graph_format})
+        for graph_format in ["rows", "columns"]
+    }
+    return {
+        name: {
+            graph_format: min(
+                timeit.repeat(lambda: encode(data), number=number, repeat=repeat)
+            )
+            / number
+            for graph_format, data in responses.items()
+        }
+        for name, encode in ENCODERS.items()
+        if encode is not None
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the calculation layers (calculator, Fires.calculate, "
+        "serializer, API request) for input profiles that retire in month 1, "
+        "in month 141 and never. Caching is disabled, so every call calculates. "
+        "Optionally, measure the conversion of results for serializing, the "
+        "throughput of the execution backends, and the JSON encoders of "
+        "responses."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--number", type=int, default=20, help="Calls per timing (default: 20)"
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Timings per layer (default: 5)"
+        )
+        parser.add_argument(
+            "--layer", action="append", choices=LAYERS, help="Only these layers"
+        )
+        parser.add_argument(
+            "--profile", action="append", choices=PROFILES, help="Only these profiles"
+        )
+        parser.add_argument(
+            "--conversions",
+            action="store_true",
+            help="Also measure dataclasses.asdict against Result.to_dict",
+        )
+        parser.add_argument(
+            "--backends",
+            action="store_true",
+            help="Also measure the throughput of every execution backend",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.FIRES_EXECUTION_WORKERS,
+            help="Workers of the thread and process backends",
+        )
+        parser.add_argument(
+            "--renderers",
+            action="store_true",
+            help="Also measure the JSON encoders of the renderer",
+        )
+        parser.add_argument("--output", help="Write the results as JSON to a file")
+        parser.add_argument(
+            "--compare",
+            nargs="?",
+            const=str(BASELINE),
+            help="Compare with results of an earlier run (default: the baseline)",
+        )
+
+    def handle(self, *args, **options):
+        max_bytes = result_cache.max_bytes
+        result_cache.max_bytes = 0
+        try:
+            with override_settings(
+                ALLOWED_HOSTS=["testserver"], FIRES_CALCULATE_CACHE_TIMEOUT=0
+            ):
+                results = {
+                    profile: {
+                        layer: measure(
+                            LAYERS[layer],
+                            PROFILES[profile],
+                            options["number"],
+                            options["repeat"],
+                        )
+                        for layer in options["layer"] or LAYERS
+                    }
+                    for profile in options["profile"] or PROFILES
+                }
+        finally:
+            result_cache.max_bytes = max_bytes
+
+        baseline = {}
+        if options["compare"]:
+            with open(options["compare"]) as file:
+                baseline = json.load(file)
+
+        self.write_results(results, baseline.get("results", {}))
+
+        conversions = {}
+        if options["conversions"]:
+            conversions = measure_conversions(
+                options["profile"] or PROFILES, options["number"], options["repeat"]
+            )
+            self.write_results(
+                conversions, baseline.get("conversions", {}), "conversions: "
+            )
+
+        backends = {}
+        if options["backends"]:
+            self.stdout.write(self.style.MIGRATE_HEADING("backends (scenarios/s)"))
+            for name in BACKENDS:
+                backends[name] = measure_backend(
+                    name, options["workers"], options["repeat"]
+                )
+                self.stdout.write(
+                    f"  {name:<12}"
+                    + "".join(
+                        f"{task:>14}{throughput:>12,.0f}"
+                        for task, throughput in backends[name].items()
+                    )
+                )
+
+        renderers = {}
+        if options["renderers"]:
+            self.stdout.write(self.style.MIGRATE_HEADING("renderers (ms)"))
+            renderers = measure_renderers(options["number"], options["repeat"])
+            for name, timings in renderers.items():
+                self.stdout.write(
+                    f"  {name:<12}"
+                    + "".join(
+                        f"{graph_format:>14}{time * 1e3:>10.3f}"
+                        for graph_format, time in timings.items()
+                    )
+                )
+
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump(
+                    {
+                        "version": VERSION,
+                        "python": platform.python_version(),
+                        "number": options["number"],
+                        "repeat": options["repeat"],
+                        "results": results,
+                        "conversions": conversions,
+                        "workers": options["workers"],
+                        "backends": backends,
+                        "renderers": renderers,
+                    },
+                    file,
+                    indent=2,
+                )
+                file.write("\n")
+
+    def write_results(self, results, baseline, heading=""):
+        """Write timings and allocations by profile, compared to a baseline."""
+        for profile, measured in results.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{heading}{profile}"))
+            for name, result in measured.items():
+                line = (
+                    f"  {name:<12}{result['median'] * 1e3:>10.3f} ms"
+                    f"{result['allocated']:>12,} bytes"
+                )
+                previous = baseline.get(profile, {}).get(name)
+                if previous:
+                    ratio = result["median"] / previous["median"]
+                    line += f"{ratio:>8.2f}x"
+                self.stdout.write(line)
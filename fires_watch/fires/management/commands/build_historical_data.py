@@ -0,0 +1,51 @@
+import csv
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from fires_watch.fires import historical
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the historical dataset file from a CSV file with the columns "
+        "'date' (YYYY-MM), 'return' (monthly total equity return, percentage) "
+        "and 'cpi' (consumer price index level), one row per month."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", help="CSV file with monthly data")
+        parser.add_argument(
+            "--output",
+            default=settings.FIRES_HISTORICAL_DATA,
+            help="Dataset file to write (default: FIRES_HISTORICAL_DATA)",
+        )
+
+    def handle(self, *args, **options):
+        if not options["output"]:
+            raise CommandError(
+                "No --output given, and FIRES_HISTORICAL_DATA is not set"
+            )
+
+        try:
+            with open(options["source"], newline="") as file:
+                rows = list(csv.DictReader(file))
+        except OSError as exc:
+            raise CommandError(f"Cannot read monthly data: {exc}")
+        if not rows:
+            raise CommandError("No monthly data found")
+
+        try:
+            year, month = (int(value) for value in rows[0]["date"].split("-"))
+            returns = [1 + float(row["return"]) / 100 for row in rows]
+            cpi = [float(row["cpi"]) for row in rows]
+        except (KeyError, ValueError) as exc:
+            raise CommandError(f"Invalid monthly data: {exc}")
+
+        try:
+            historical.write(options["output"], year, month, returns, cpi)
+        except OSError as exc:
+            raise CommandError(f"Cannot write the dataset: {exc}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote {len(rows)} months to {options['output']}")
+        )
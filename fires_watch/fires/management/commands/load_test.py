@@ -0,0 +1,125 @@
+import http.client
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from fires_watch.fires.management.commands.benchmark import PROFILES
+
+
+def post(url, body, delay):
+    """
+    POST a JSON body, and return the response time in seconds.
+
+    With a delay, the body is sent in two halves with the delay in between,
+    like a slow client on a poor connection.
+    """
+    parts = urlsplit(url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+    start = time.perf_counter()
+    try:
+        connection.putrequest("POST", parts.path)
+        connection.putheader("Content-Type", "application/json")
+        connection.putheader("Content-Length", str(len(body)))
+        connection.endheaders()
+        half = len(body) // 2
+        connection.send(body[:half])
+        if delay:
+            time.sleep(delay)
+        connection.send(body[half:])
+        response = connection.getresponse()
+        response.read()
+    finally:
+        connection.close()
+    if response.status != 200:
+        raise CommandError(f"Request failed with status {response.status}")
+    return time.perf_counter() - start
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of sorted values."""
+    return values[max(round(percent / 100 * len(values)) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test a running server with concurrent calculate requests, e.g. "
+        "to compare WSGI and ASGI deployments (see config/asgi.py)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "url", help="Calculate URL, e.g. http://localhost:8000/api/fires/calculate/"
+        )
+        parser.add_argument(
+            "--requests", type=int, default=200, help="Number of requests"
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=16, help="Simultaneous connections"
+        )
+        parser.add_argument(
+            "--slow",
+            type=float,
+            default=0,
+            help="Seconds every client pauses while sending its request",
+        )
+        parser.add_argument(
+            "--profile", choices=PROFILES, default="month_141", help="Input profile"
+        )
+        parser.add_argument("--output", help="Write the results as JSON to a file")
+
+    def handle(self, *args, **options):
+        # Unique input per request, so the response cache doesn't interfere
+        bodies = [
+            json.dumps(
+                {**PROFILES[options["profile"]], "portfolio_value": 100000 + index}
+            ).encode()
+            for index in range(options["requests"])
+        ]
+        lock = threading.Lock()
+        errors = []
+
+        def request(body):
+            try:
+                return post(options["url"], body, options["slow"])
+            except (OSError, CommandError) as exc:
+                with lock:
+                    errors.append(str(exc))
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+            timings = list(executor.map(request, bodies))
+        elapsed = time.perf_counter() - start
+
+        timings = sorted(timing for timing in timings if timing is not None)
+        if not timings:
+            raise CommandError(f"All requests failed: {errors[0]}")
+        results = {
+            "url": options["url"],
+            "requests": options["requests"],
+            "concurrency": options["concurrency"],
+            "slow": options["slow"],
+            "errors": len(errors),
+            "requests_per_second": len(timings) / elapsed,
+            "latency": {
+                "mean": statistics.mean(timings),
+                "p50": percentile(timings, 50),
+                "p95": percentile(timings, 95),
+                "p99": percentile(timings, 99),
+            },
+        }
+
+        latency = results["latency"]
+        self.stdout.write(
+            f"{results['requests_per_second']:.1f} requests/s, latency "
+            f"p50 {latency['p50'] * 1e3:.0f} ms, p95 {latency['p95'] * 1e3:.0f} ms, "
+            f"p99 {latency['p99'] * 1e3:.0f} ms, {len(errors)} errors"
+        )
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump(results, file, indent=2)
+                file.write("\n")
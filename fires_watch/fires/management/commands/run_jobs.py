@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from fires_watch.fires.jobs import RedisQueue, get_queue
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued jobs (see fires.jobs). Requires Redis as cache, without it "
+        "jobs are run by the process that queued them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--burst", action="store_true", help="Stop when the queue is empty"
+        )
+
+    def handle(self, *args, **options):
+        queue = get_queue()
+        if not isinstance(queue, RedisQueue):
+            raise CommandError("Jobs are only queued in Redis with a Redis cache")
+
+        self.stdout.write("Waiting for jobs")
+        queue.work(burst=options["burst"])
@@ -0,0 +1,142 @@
+import numpy as np
+
+from fires_watch.fires import vectorized
+
+# Number of paths simulated together. Each chunk keeps a few arrays of
+# CHUNK_PATHS floats per month, and the yearly portfolio of every path.
+CHUNK_PATHS = 10000
+
+# Supported distributions of yearly returns and inflation:
+# - normal: a yearly percentage is drawn from a normal distribution for every
+#   year, and applied evenly over the months of that year
+# - lognormal: a monthly growth factor is drawn from a lognormal distribution
+#   for every month, with the given yearly mean and standard deviation
+DISTRIBUTIONS = ["normal", "lognormal"]
+
+
+def monthly_factors(rng, distribution, mean, std, paths):
+    """
+    Draw the monthly growth factors of one year from yearly percentages.
+
+    Returns an array of (12, paths) factors, which are never negative
+    (a yearly percentage below -100 is treated as losing everything).
+    """
+    if distribution == "normal":
+        yearly = rng.normal(mean, std, size=paths)
+        factors = (1 + np.maximum(yearly, -100) / 100) ** (1 / 12)
+        return np.broadcast_to(factors, (12, paths))
+
+    # Parameters of the underlying normal distribution of the yearly log
+    # growth, matching the mean and standard deviation of the yearly factor.
+    growth = max(1 + mean / 100, 1e-9)
+    variance = np.log1p((std / 100 / growth) ** 2)
+    log_mean = np.log(growth) - variance / 2
+    return np.exp(rng.normal(log_mean / 12, np.sqrt(variance / 12), (12, paths)))
+
+
+def simulate_chunk(seed, paths, scenario, months=vectorized.MONTHS):
+    """
+    Simulate a chunk of paths, see simulate.
+
+    All paths step through the months together (like vectorized.march), so
+    every operation works on an array of paths, and memory stays linear in
+    the number of paths. Only depends on numpy, so it can run in a worker
+    process without setting up Django.
+
+    Returns the retirement month per path (0 if never reached) and a 2D array
+    of the yearly average portfolio, of (years, paths).
+    """
+    rng = np.random.default_rng(seed)
+    portfolio = np.full(paths, float(scenario["initial_portfolio"]))
+    expenses = np.full(paths, float(scenario["monthly_expenses"]))
+    retirement_month = np.zeros(paths, dtype=int)
+    yearly = np.zeros((months // 12, paths), dtype=np.float32)
+
+    for year in range(months // 12):
+        return_factor = monthly_factors(
+            rng,
+            scenario["distribution"],
+            scenario["return_mean"],
+            scenario["return_std"],
+            paths,
+        )
+        inflation_factor = monthly_factors(
+            rng,
+            scenario["distribution"],
+            scenario["inflation_mean"],
+            scenario["inflation_std"],
+            paths,
+        )
+        total = np.zeros(paths)
+
+        # Same calculation as Calculator, for every path at once
+        for month in range(12):
+            np.multiply(expenses, inflation_factor[month], out=expenses)
+            savings = np.maximum(scenario["monthly_income"] - expenses, 0)
+            np.multiply(portfolio, return_factor[month], out=portfolio)
+            np.add(portfolio, savings, out=portfolio)
+            total += portfolio
+
+            reached = portfolio > expenses * 12 / scenario["safe_rate"]
+            retirement_month[reached & (retirement_month == 0)] = year * 12 + month + 1
+
+        yearly[year] = total / 12
+
+    return retirement_month, yearly
+
+
+def nearest_rank(values, percentile):
+    """Nearest-rank percentile of sorted values, or None if it is infinite."""
+    index = max(int(np.ceil(percentile / 100 * len(values))) - 1, 0)
+    value = values[index]
+    return None if np.isinf(value) else int(value)
+
+
+def simulate(scenario, paths, seed=None, backend=None):
+    """
+    Simulate many paths of random returns and inflation.
+
+    The scenario holds the initial values (see UserInfo) and the parameters
+    of the distributions. Paths are simulated in chunks of CHUNK_PATHS, with
+    a seed per chunk derived from the given seed, so results don't depend on
+    the backend (see backends.BACKENDS) the chunks are divided over, if any.
+
+    Returns:
+    - Success probability (fraction of paths reaching the retirement goal)
+    - Retirement month percentiles (None if not reached at that percentile)
+    - Yearly percentile bands of the (yearly average) portfolio
+    """
+    chunks = [CHUNK_PATHS] * (paths // CHUNK_PATHS)
+    if paths % CHUNK_PATHS:
+        chunks.append(paths % CHUNK_PATHS)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    scenarios = [scenario] * len(chunks)
+
+    if backend is not None and len(chunks) > 1:
+        results = backend.map(simulate_chunk, seeds, chunks, scenarios)
+    else:
+        results = list(map(simulate_chunk, seeds, chunks, scenarios))
+
+    retirement_month = np.concatenate([result[0] for result in results])
+    yearly = np.concatenate([result[1] for result in results], axis=1)
+
+    months = np.sort(np.where(retirement_month > 0, retirement_month, np.inf))
+    bands = np.percentile(yearly, [5, 50, 95], axis=1)
+    return {
+        "paths": paths,
+        "success_probability": float(np.mean(retirement_month > 0)),
+        "months": {
+            "p5": nearest_rank(months, 5),
+            "p50": nearest_rank(months, 50),
+            "p95": nearest_rank(months, 95),
+        },
+        "graph_years": [
+            {
+                "year": float(year + 1),
+                "p5": round(p5),
+                "p50": round(p50),
+                "p95": round(p95),
+            }
+            for year, (p5, p50, p95) in enumerate(bands.T.tolist())
+        ],
+    }
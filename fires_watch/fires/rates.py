@@ -0,0 +1,77 @@
+import functools
+
+import numpy as np
+
+# Steps per percentage point of the lookup table: users submit percentages
+# with at most two decimals.
+SCALE = 100
+
+# Range of the lookup table (percentages), the range the serializer allows
+LIMIT = 100
+
+
+@functools.lru_cache(maxsize=4096)
+def monthly_factor(percentage):
+    """Monthly growth factor of a yearly percentage, e.g. 1.0033 for 4%."""
+    return (1 + percentage / 100) ** (1 / 12)
+
+
+@functools.lru_cache(maxsize=None)
+def factor_table():
+    """
+    Monthly growth factors of every percentage from -LIMIT through LIMIT, in
+    steps of 1 / SCALE. Computed once, with the same operations as
+    monthly_factor, so lookups give identical factors.
+    """
+    steps = range(-LIMIT * SCALE, LIMIT * SCALE + 1)
+    return np.array([monthly_factor(step / SCALE) for step in steps])
+
+
+def monthly_factors(percentages):
+    """
+    Monthly growth factors of an array of yearly percentages (see
+    monthly_factor). Percentages in the lookup table are looked up, only
+    others (like a sweep between arbitrary bounds) are calculated.
+    """
+    percentages = np.asarray(percentages, dtype=float)
+    steps = np.rint(percentages * SCALE)
+    with np.errstate(invalid="ignore"):
+        listed = (steps / SCALE == percentages) & (np.abs(steps) <= LIMIT * SCALE)
+    index = np.where(listed, steps + LIMIT * SCALE, 0).astype(np.intp)
+    factors = factor_table()[index]
+    if not listed.all():
+        factors = np.where(listed, factors, (1 + percentages / 100) ** (1 / 12))
+    return factors
+
+
+def tabulate(function, rates, exponents):
+    """
+    Evaluate function(*rates, exponents) for scenarios which share rates.
+
+    The rates are columns (one value per scenario) and the exponents are
+    integers (a row of months, or a row per scenario), like the powers and
+    geometric sums of the closed-form solution (see vectorized.solve).
+    Scenarios often share their rates, e.g. a sweep of expenses or a goal
+    seek of the portfolio, so when it takes fewer evaluations, function is
+    evaluated once for every distinct combination of rates and every
+    exponent in the range, and the results are looked up per scenario.
+    """
+    exponents = np.asarray(exponents)
+    columns = np.broadcast_arrays(
+        *(np.asarray(rate, dtype=float).reshape(-1, 1) for rate in rates)
+    )
+    scenarios = len(columns[0])
+    if scenarios < 2 or not exponents.size:
+        return function(*columns, exponents)
+
+    distinct, inverse = np.unique(np.hstack(columns), axis=0, return_inverse=True)
+    low, high = exponents.min(), exponents.max()
+    if len(distinct) * (high - low + 1) >= np.broadcast(columns[0], exponents).size:
+        return function(*columns, exponents)
+
+    table = function(
+        *(column.reshape(-1, 1) for column in distinct.T),
+        np.arange(low, high + 1, dtype=exponents.dtype),
+    )
+    index = (exponents - low).astype(np.intp)
+    return table[inverse.reshape(-1, 1), index]
@@ -0,0 +1,106 @@
+import numpy as np
+
+
+def bucket_limit(max_points):
+    """
+    Number of buckets of a series downsampled to max_points points: every
+    bucket keeps up to two points, and the pinned point comes on top.
+    """
+    return max((max_points - 1) // 2, 1)
+
+
+def bucket_width(count, max_points):
+    """Points per bucket: the smallest power of two that needs few enough."""
+    limit = bucket_limit(max_points)
+    width = 1
+    while -(-count // width) > limit:
+        width *= 2
+    return width
+
+
+class Sampler:
+    """
+    Downsamples a series to at most max_points points, as it is generated.
+
+    Consecutive points are grouped into buckets, of which only the points with
+    the lowest and highest key value (e.g. the portfolio) are kept, so the
+    peaks and dips of a graph are preserved. Buckets start with a single
+    point, and pairs of buckets are merged whenever there would be too many.
+    This results in the same buckets as when the length of the series is
+    known up front (see bucket_width and sample). The pinned point (e.g. the
+    retirement month) is always kept.
+
+    Points are (position, values) tuples, where position counts from 0.
+    """
+
+    def __init__(self, max_points, key=0):
+        self.max_points = max_points
+        self.limit = bucket_limit(max_points)
+        self.key = key
+        self.width = 1
+        self.count = 0
+        self.buckets = []
+        self.pinned = None
+
+    def add(self, values, pin=False):
+        """Add the values of the next point, optionally pinning it."""
+        point = (self.count, values)
+        self.count += 1
+        if pin:
+            self.pinned = point
+
+        if point[0] % self.width == 0 and len(self.buckets) == self.limit:
+            self.merge()
+        if point[0] % self.width:
+            # NOTE: On ties, the earliest point is kept (like numpy's argmin).
+            bucket = self.buckets[-1]
+            if values[self.key] < bucket[0][1][self.key]:
+                bucket[0] = point
+            if values[self.key] > bucket[1][1][self.key]:
+                bucket[1] = point
+        else:
+            self.buckets.append([point, point])
+
+    def merge(self):
+        """Merge every pair of buckets, doubling their width."""
+        key = self.key
+        buckets = self.buckets
+        if len(buckets) % 2:
+            buckets.append(buckets[-1])
+        self.buckets = [
+            [
+                min(first[0], second[0], key=lambda point: point[1][key]),
+                max(first[1], second[1], key=lambda point: point[1][key]),
+            ]
+            for first, second in zip(buckets[::2], buckets[1::2])
+        ]
+        self.width *= 2
+
+    def points(self):
+        """The kept points, in order."""
+        points = {point[0]: point for bucket in self.buckets for point in bucket}
+        if self.pinned is not None:
+            points[self.pinned[0]] = self.pinned
+        return [points[position] for position in sorted(points)]
+
+
+def sample(keys, max_points, pinned=None):
+    """
+    Positions of the points Sampler keeps of a series, from the key values of
+    all its points at once (an array, which may hold Python integers).
+    """
+    count = len(keys)
+    if not count:
+        return np.arange(0)
+    width = bucket_width(count, max_points)
+    buckets = -(-count // width)
+
+    # Pad the last bucket with copies of the last point, which are never
+    # kept over it (the earliest point wins ties).
+    padding = np.repeat(keys[-1:], buckets * width - count)
+    padded = np.concatenate((keys, padding)).reshape(buckets, width)
+    start = np.arange(buckets) * width
+    positions = [start + padded.argmin(axis=1), start + padded.argmax(axis=1)]
+    if pinned is not None:
+        positions.append([pinned])
+    return np.unique(np.concatenate(positions))
@@ -7,3 +7,67 @@ pytestmark = pytest.mark.django_db
 def test_calculate():
     assert reverse("api:fires-calculate") == "/api/fires/calculate/"
     assert resolve("/api/fires/calculate/").view_name == "api:fires-calculate"
+
+
+def test_batch():
+    assert reverse("api:fires-batch") == "/api/fires/batch/"
+    assert resolve("/api/fires/batch/").view_name == "api:fires-batch"
+
+
+def test_sweep():
+    assert reverse("api:fires-sweep") == "/api/fires/sweep/"
+    assert resolve("/api/fires/sweep/").view_name == "api:fires-sweep"
+
+
+def test_monte_carlo():
+    assert reverse("api:fires-monte-carlo") == "/api/fires/monte-carlo/"
+    assert resolve("/api/fires/monte-carlo/").view_name == "api:fires-monte-carlo"
+
+
+def test_backtest():
+    assert reverse("api:fires-backtest") == "/api/fires/backtest/"
+    assert resolve("/api/fires/backtest/").view_name == "api:fires-backtest"
+
+
+def test_calculate_stream():
+    assert reverse("api:fires-calculate-stream") == "/api/fires/calculate-stream/"
+    assert (
+        resolve("/api/fires/calculate-stream/").view_name
+        == "api:fires-calculate-stream"
+    )
+
+
+def test_calculate_async():
+    assert reverse("api:fires-calculate-async") == "/api/fires/calculate-async/"
+    assert (
+        resolve("/api/fires/calculate-async/").view_name == "api:fires-calculate-async"
+    )
+
+
+def test_jobs():
+    assert reverse("api:fires-jobs") == "/api/fires/jobs/"
+    assert resolve("/api/fires/jobs/").view_name == "api:fires-jobs"
+    job_id = "0123456789abcdef" * 2
+    url = f"/api/fires/jobs/{job_id}/"
+    assert reverse("api:fires-job", kwargs={"job_id": job_id}) == url
+    assert resolve(url).view_name == "api:fires-job"
+    assert reverse("api:fires-job-stream", kwargs={"job_id": job_id}) == (
+        f"{url}stream/"
+    )
+    assert reverse("api:fires-job-metrics") == "/api/fires/jobs/metrics/"
+    assert resolve("/api/fires/jobs/metrics/").view_name == "api:fires-job-metrics"
+
+
+def test_goal_seek():
+    assert reverse("api:fires-goal-seek") == "/api/fires/goal-seek/"
+    assert resolve("/api/fires/goal-seek/").view_name == "api:fires-goal-seek"
+
+
+def test_sensitivity():
+    assert reverse("api:fires-sensitivity") == "/api/fires/sensitivity/"
+    assert resolve("/api/fires/sensitivity/").view_name == "api:fires-sensitivity"
+
+
+def test_v2_calculate():
+    assert reverse("api:fires-v2-calculate") == "/api/v2/fires/calculate/"
+    assert resolve("/api/v2/fires/calculate/").view_name == "api:fires-v2-calculate"
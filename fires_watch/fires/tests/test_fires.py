@@ -1,9 +1,69 @@
+import datetime
+import decimal
+import gzip
+import io
+import json
+import random
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+
+import numpy as np
 import pytest
+from asgiref.sync import async_to_sync
+from django.apps import apps
+from django.core.cache import cache as django_cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.http import QueryDict
+from django.test import AsyncClient
 from django.urls.base import reverse
+from rest_framework.renderers import JSONRenderer
+
+from fires_watch.fires import (
+    cache,
+    compression,
+    historical,
+    jobs,
+    rates,
+    sampling,
+    vectorized,
+)
+from fires_watch.fires.api import renderers
+from fires_watch.fires.api.compiled import compiled
+from fires_watch.fires.api.serializers import (
+    FiresCalculateSerializer,
+    FiresGoalSeekSerializer,
+    FiresInputSerializer,
+    FiresJobSerializer,
+    FiresMonteCarloSerializer,
+)
+from fires_watch.fires.backends import BACKENDS, ThreadBackend, get_backend
+from fires_watch.fires.fires import (
+    ENGINES,
+    GOAL_FIELDS,
+    SENSITIVITY_BOUNDS,
+    SENSITIVITY_STEPS,
+    SWEEP_CHUNK_SCENARIOS,
+    Calculator,
+    Fires,
+    ResultCache,
+    UserInfo,
+    graph_size,
+    result_cache,
+)
 
 pytestmark = pytest.mark.django_db
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    django_cache.clear()
+    result_cache.clear()
+    cache.compressed_cache.clear()
+
+
 @pytest.fixture
 def valid_payload():
     return {
@@ -80,6 +140,81 @@ class TestFires:
         response = admin_client.post(url, payload)
         assert response.status_code == 400
 
+    def test_calculate_summary_only(
+        self, admin_client, valid_payload, valid_payload_result
+    ):
+        url = reverse("api:fires-calculate")
+        response = admin_client.post(url, {**valid_payload, "summary_only": True})
+        assert response.status_code == 200
+        result = response.data["fires_calculate_result"]
+        for variable in ["cost_of_living", "portfolio", "months"]:
+            assert result[variable] == valid_payload_result[variable]
+        assert result["graph_months"] == []
+        assert result["graph_years"] == []
+
+    def test_calculate_columns(self, admin_client, valid_payload):
+        url = reverse("api:fires-calculate")
+        rows = admin_client.post(url, valid_payload)
+        columns = admin_client.post(url, {**valid_payload, "graph_format": "columns"})
+        assert columns.status_code == 200
+        assert len(columns.content) < len(rows.content) / 2
+        for graph in ["graph_months", "graph_years"]:
+            expected = rows.data["fires_calculate_result"][graph]
+            result = columns.data["fires_calculate_result"][graph]
+            assert list(result) == list(expected[0])
+            for variable, values in result.items():
+                assert values == [item[variable] for item in expected]
+
+    @pytest.mark.parametrize("max_points", [3, 10, 100])
+    def test_calculate_max_points(self, admin_client, valid_payload, max_points):
+        url = reverse("api:fires-calculate")
+        full = admin_client.post(url, valid_payload).data["fires_calculate_result"]
+        payload = {**valid_payload, "max_points": max_points}
+        response = admin_client.post(url, payload)
+        assert response.status_code == 200
+        result = response.data["fires_calculate_result"]
+        assert result["months"] == full["months"]
+
+        # Datapoints are a selection of the full graph, including retirement
+        months = result["graph_months"]
+        assert 3 <= len(months) <= max_points
+        assert full["months"] in [month["month"] for month in months]
+        for month in months:
+            datapoint = {
+                "month": month["month"],
+                **full["graph_months"][month["month"] - 1],
+            }
+            assert month == datapoint
+        years = result["graph_years"]
+        assert 3 <= len(years) <= max_points
+        assert full["months"] // 12 + 1 in [year["year"] for year in years]
+        for year in years:
+            assert year == full["graph_years"][int(year["year"]) - 1]
+
+        # The lowest and highest portfolio are kept
+        for graph in ["graph_months", "graph_years"]:
+            portfolios = [item["portfolio"] for item in result[graph]]
+            expected = [item["portfolio"] for item in full[graph]]
+            assert min(portfolios) == min(expected)
+            assert max(portfolios) == max(expected)
+
+    @pytest.mark.parametrize(
+        "changes", [{}, {"portfolio_value": 1, "expenses_per_year": 50000}]
+    )
+    @pytest.mark.parametrize("columnar", [False, True])
+    def test_calculate_max_points_engines(self, valid_payload, changes, columnar):
+        payload = {**valid_payload, **changes}
+        expected = Fires.calculate(payload, "iterative", columnar, max_points=20)
+        result = Fires.calculate(payload, "vectorized", columnar, max_points=20)
+        assert result == expected
+        [batch] = Fires.calculate_many([payload], "vectorized", columnar, max_points=20)
+        assert batch == expected
+
+    def test_calculate_max_points_invalid(self, admin_client, valid_payload):
+        url = reverse("api:fires-calculate")
+        response = admin_client.post(url, {**valid_payload, "max_points": 2})
+        assert response.status_code == 400
+
     def test_calculation_timeout_no_result(self, admin_client):
         """
         This test will perform a calculation that will never reach a
@@ -104,3 +239,1432 @@ class TestFires:
             assert result[variable] is None
         assert len(result["graph_months"]) == 1200
         assert len(result["graph_years"]) == 100
+
+
+class TestFiresCache:
+    def test_calculate_cached(self, admin_client, valid_payload):
+        url = reverse("api:fires-calculate")
+        response = admin_client.post(url, valid_payload)
+        assert cache.stats() == {"hits": 0, "misses": 1, "hit_rate": 0}
+        result_cache.clear()
+        cached = admin_client.post(url, valid_payload)
+        assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+        assert cached.status_code == 200
+        assert cached["Content-Type"] == "application/json"
+        assert cached.content == response.content
+        assert cached.data == response.data
+
+    def test_calculate_result_cached(self, admin_client, valid_payload):
+        url = reverse("api:fires-calculate")
+        response = admin_client.post(url, valid_payload)
+        cached = admin_client.post(url, valid_payload)
+        assert cached.data == response.data
+        # The in-process cache is used before the shared cache
+        assert cache.stats()["hits"] == 0
+        assert result_cache.stats()["hits"] == 1
+
+    def test_result_cache(self, valid_payload):
+        result = Fires.calculate(valid_payload)
+        assert Fires.calculate({**valid_payload, "currency": "USD"}) is result
+        stats = result_cache.stats()
+        assert stats["entries"] == 1
+        assert stats["hit_rate"] == 0.5
+        assert stats["bytes"] > len(result["graph_months"]) * 100
+
+    def test_result_cache_bounded_by_size(self, valid_payload):
+        lru = ResultCache(max_bytes=10 ** 6)
+        results = {}
+        for expenses in range(10000, 20000, 1000):
+            result = Fires.calculate({**valid_payload, "expenses_per_year": expenses})
+            results[expenses] = result
+            lru.put(expenses, result)
+            assert lru.bytes <= lru.max_bytes
+        assert 0 < lru.stats()["entries"] < len(results)
+        assert lru.get(10000) is None
+        assert lru.get(19000) is results[19000]
+
+    def test_result_cache_threads(self, valid_payload):
+        result = Fires.calculate(valid_payload)
+        size = graph_size(result["graph_months"]) + graph_size(result["graph_years"])
+        lru = ResultCache(max_bytes=size * 3)
+
+        def use(thread):
+            for key in range(2000):
+                lru.put((thread, key % 5), result)
+                lru.get((thread - 1, key % 5))
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(use, range(8)))
+        assert lru.bytes == size * len(lru.entries) <= lru.max_bytes
+
+    def test_content_cache(self):
+        lru = cache.ContentCache(max_bytes=10)
+        for key in "abc":
+            lru.put(key, key.encode() * 4)
+        assert lru.get("a") is None
+        assert lru.get("c") == b"cccc"
+        assert lru.bytes == 8
+        lru.put("large", b"x" * 11)
+        assert lru.get("large") is None
+
+    def test_calculate_key(self, valid_payload):
+        key = cache.calculate_key(valid_payload)
+        reordered = dict(reversed(list(valid_payload.items())))
+        assert cache.calculate_key(reordered) == key
+        changed = {**valid_payload, "expenses_per_year": 25001}
+        assert cache.calculate_key(changed) != key
+
+    def test_calculate_etag(self, client, valid_payload):
+        url = reverse("api:fires-calculate")
+        etag = client.post(url, valid_payload)["ETag"]
+        assert client.get(url, valid_payload)["ETag"] == etag
+        changed = client.post(url, {**valid_payload, "expenses_per_year": 25001})
+        assert changed["ETag"] != etag
+
+        # Unchanged responses are not sent (nor calculated) again
+        result_cache.clear()
+        for header in [etag, f"W/{etag}", f'"other", {etag}', "*"]:
+            response = client.get(url, valid_payload, HTTP_IF_NONE_MATCH=header)
+            assert response.status_code == 304
+            assert response["ETag"] == etag
+            assert response.content == b""
+        # Only GET requests are not modified, other methods fail the condition
+        response = client.post(url, valid_payload, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 412
+        assert result_cache.stats()["misses"] == 0
+        response = client.get(url, valid_payload, HTTP_IF_NONE_MATCH='"other"')
+        assert response.status_code == 200
+
+    def test_calculate_etag_year(self, valid_payload, monkeypatch):
+        etag = cache.etag(valid_payload)
+        next_year = datetime.date(datetime.date.today().year + 1, 1, 1)
+
+        class NextYear(datetime.date):
+            @classmethod
+            def today(cls):
+                return next_year
+
+        monkeypatch.setattr(cache.datetime, "date", NextYear)
+        assert cache.etag(valid_payload) != etag
+
+    def test_calculate_indent(self, client, valid_payload):
+        url = reverse("api:fires-calculate")
+        compact = client.post(url, valid_payload)
+        indented = client.post(
+            url, valid_payload, HTTP_ACCEPT="application/json; indent=4"
+        )
+        assert indented.content.startswith(b'{\n    "')
+        assert json.loads(indented.content) == json.loads(compact.content)
+        assert not indented.has_header("ETag")
+        assert client.post(url, valid_payload).content == compact.content
+
+    def test_calculate_max_age(self, settings):
+        assert cache.max_age() == 3600
+        settings.FIRES_CALCULATE_MAX_AGE = 10 ** 9
+        assert 0 < cache.max_age() <= 366 * 24 * 3600
+
+    def test_calculate_async_etag(self, client, valid_payload):
+        url = reverse("api:fires-calculate-async")
+        response = client.post(url, valid_payload, content_type="application/json")
+        etag = client.post(reverse("api:fires-calculate"), valid_payload)["ETag"]
+        assert response["ETag"] == etag
+        response = client.post(
+            url, valid_payload, content_type="application/json", HTTP_IF_NONE_MATCH=etag
+        )
+        assert response.status_code == 412
+
+    def test_calculate_not_cached(self, admin_client, valid_payload, settings):
+        settings.FIRES_CALCULATE_CACHE_TIMEOUT = 0
+        url = reverse("api:fires-calculate")
+        admin_client.post(url, valid_payload)
+        admin_client.post(url, valid_payload)
+        assert cache.stats()["hits"] == 0
+
+
+class TestFiresV2:
+    def test_calculate(self, client, valid_payload):
+        url = reverse("api:fires-v2-calculate")
+        response = client.post(url, valid_payload)
+        assert response.status_code == 200
+        expected = client.post(reverse("api:fires-calculate"), valid_payload)
+        assert response.data == expected.data["fires_calculate_result"]
+        assert response["Server-Timing"].startswith("calculate;dur=")
+        cached = client.get(url, valid_payload)
+        assert cached.data == response.data
+        # Cached in this process
+        assert "Server-Timing" not in cached
+
+    def test_calculate_cached(self, client, valid_payload):
+        url = reverse("api:fires-v2-calculate")
+        response = client.post(url, valid_payload)
+        result_cache.clear()
+        cached = client.post(url, valid_payload)
+        assert cache.stats()["hits"] == 1
+        assert cached.content == response.content
+        # Not calculated
+        assert "Server-Timing" not in cached
+
+        # Cached apart from version 1
+        result_cache.clear()
+        client.post(reverse("api:fires-calculate"), valid_payload)
+        assert cache.stats()["misses"] == 2
+
+    def test_calculate_etag(self, client, valid_payload):
+        url = reverse("api:fires-v2-calculate")
+        etag = client.post(url, valid_payload)["ETag"]
+        response = client.get(url, valid_payload, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert "Server-Timing" not in response
+
+    def test_calculate_invalid(self, client, valid_payload):
+        url = reverse("api:fires-v2-calculate")
+        response = client.post(url, {**valid_payload, "birth_year": 1800})
+        assert response.status_code == 400
+        assert list(response.data) == ["birth_year"]
+
+
+class TestFiresCompression:
+    @pytest.fixture
+    def compressions(self, monkeypatch):
+        calls = []
+        compress = compression.gzip.compress
+
+        def counted(content, *args, **kwargs):
+            calls.append(len(content))
+            return compress(content, *args, **kwargs)
+
+        monkeypatch.setattr(compression.gzip, "compress", counted)
+        return calls
+
+    def test_calculate(self, client, valid_payload, compressions):
+        url = reverse("api:fires-calculate")
+        plain = client.post(url, valid_payload)
+        response = client.post(url, valid_payload, HTTP_ACCEPT_ENCODING="gzip")
+        assert response["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in response["Vary"]
+        assert response["ETag"] == f"W/{plain['ETag']}"
+        assert gzip.decompress(response.content) == plain.content
+        assert len(response.content) < len(plain.content) / 4
+
+        # Compressed once, and cached in this process (without a lookup in
+        # the shared cache)
+        stats = cache.stats()
+        cached = client.post(url, valid_payload, HTTP_ACCEPT_ENCODING="gzip")
+        assert cached.content == response.content
+        assert cached["Content-Encoding"] == "gzip"
+        assert cache.stats() == stats
+        assert len(compressions) == 1
+
+        # Results calculated by other workers come from the shared cache
+        for _ in range(2):
+            result_cache.clear()
+            cache.compressed_cache.clear()
+            cached = client.post(url, valid_payload, HTTP_ACCEPT_ENCODING="gzip")
+            assert cached.content == response.content
+        assert cache.stats()["hits"] == stats["hits"] + 1
+        assert len(compressions) == 2
+
+        response = client.get(
+            url,
+            valid_payload,
+            HTTP_ACCEPT_ENCODING="gzip",
+            HTTP_IF_NONE_MATCH=response["ETag"],
+        )
+        assert response.status_code == 304
+        assert response["ETag"] == f"W/{plain['ETag']}"
+        assert not response.has_header("Content-Encoding")
+
+        # Like the 200 responses, the ETag is only weak for clients with gzip
+        response = client.get(
+            url, valid_payload, HTTP_IF_NONE_MATCH=f"W/{plain['ETag']}"
+        )
+        assert response.status_code == 304
+        assert response["ETag"] == plain["ETag"]
+
+    def test_calculate_small(self, client, valid_payload, settings):
+        url = reverse("api:fires-calculate")
+        payload = {**valid_payload, "summary_only": True}
+        response = client.post(url, payload, HTTP_ACCEPT_ENCODING="gzip")
+        assert not response.has_header("Content-Encoding")
+        assert response.data["fires_calculate_result"]["months"] == 141
+
+        settings.FIRES_COMPRESSION_MIN_SIZE = 10
+        response = client.post(url, payload, HTTP_ACCEPT_ENCODING="gzip")
+        assert response["Content-Encoding"] == "gzip"
+
+    def test_calculate_async(self, client, valid_payload):
+        response = client.post(
+            reverse("api:fires-calculate-async"),
+            valid_payload,
+            content_type="application/json",
+            HTTP_ACCEPT_ENCODING="gzip",
+        )
+        assert response["Content-Encoding"] == "gzip"
+        result = json.loads(gzip.decompress(response.content))
+        assert result["fires_calculate_result"]["months"] == 141
+        assert response["ETag"].startswith("W/")
+
+    def test_middleware(self, client, valid_payload, compressions):
+        url = reverse("api:fires-batch")
+        payload = [valid_payload] * 2
+        response = client.post(
+            url, payload, content_type="application/json", HTTP_ACCEPT_ENCODING="gzip"
+        )
+        assert response["Content-Encoding"] == "gzip"
+        assert int(response["Content-Length"]) == len(response.content)
+        assert len(json.loads(gzip.decompress(response.content))) == 2
+        assert len(compressions) == 1
+
+        response = client.post(url, payload, content_type="application/json")
+        assert not response.has_header("Content-Encoding")
+        assert "Accept-Encoding" in response["Vary"]
+
+    def test_disabled(self, client, valid_payload, settings):
+        settings.FIRES_COMPRESSION_LEVEL = 0
+        response = client.post(
+            reverse("api:fires-calculate"),
+            valid_payload,
+            HTTP_ACCEPT_ENCODING="gzip",
+        )
+        assert not response.has_header("Content-Encoding")
+
+
+class TestFiresStream:
+    def test_calculate_stream(self, admin_client, valid_payload):
+        url = reverse("api:fires-calculate-stream")
+        response = admin_client.post(url, valid_payload)
+        assert response.status_code == 200
+        assert response["Content-Type"] == "application/x-ndjson"
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        first, *months = [json.loads(line) for line in lines]
+
+        expected = admin_client.post(
+            reverse("api:fires-calculate"), {**valid_payload, "summary_only": True}
+        ).json()
+        assert first == {**expected, "summary_only": False}
+        result = Fires.calculate(valid_payload)
+        assert months == result["graph_months"]
+
+    def test_calculate_stream_summary_only(self, admin_client, valid_payload):
+        url = reverse("api:fires-calculate-stream")
+        response = admin_client.post(url, {**valid_payload, "summary_only": True})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        assert len(lines) == 1
+
+    def test_calculate_stream_invalid(self, admin_client, valid_payload):
+        url = reverse("api:fires-calculate-stream")
+        response = admin_client.post(url, {})
+        assert response.status_code == 400
+        assert "birth_year" in response.data
+        response = admin_client.post(url, {**valid_payload, "graph_format": "columns"})
+        assert response.status_code == 400
+        assert "graph_format" in response.data
+
+    @pytest.mark.parametrize(
+        "payload",
+        [
+            {},
+            {"expenses_per_year": 50000, "portfolio_percentage_per_year": 0},
+            {
+                "income_gross_per_year": 50006,
+                "portfolio_percentage_per_year": 0,
+                "inflation_percentage_per_year": 0,
+            },
+        ],
+    )
+    def test_stream(self, valid_payload, payload):
+        payload = {**valid_payload, **payload}
+        summary, months = Fires.stream(payload)
+        expected = Fires.calculate(payload)
+        assert list(months) == expected.pop("graph_months")
+        assert summary == {**expected, "graph_months": [], "graph_years": []}
+
+    def test_stream_lazy(self, valid_payload, monkeypatch):
+        calculated = []
+        generate = Calculator.generate_monthly_values
+        monkeypatch.setattr(
+            Calculator,
+            "generate_monthly_values",
+            lambda self: calculated.append(self.month_count) or generate(self),
+        )
+        payload = {**valid_payload, "expenses_per_year": 50000, "portfolio_value": 1}
+        summary, months = Fires.stream(payload)
+        # The result doesn't depend on the months, which are only calculated
+        # while they are streamed
+        assert summary["months"] is None
+        assert calculated == []
+        next(months)
+        assert calculated == [1]
+
+
+class TestFiresAsync:
+    def test_calculate_async(self, client, valid_payload):
+        url = reverse("api:fires-calculate-async")
+        response = client.post(url, valid_payload, content_type="application/json")
+        assert response.status_code == 200
+        expected = client.post(reverse("api:fires-calculate"), valid_payload)
+        assert response.json() == expected.json()
+
+    def test_calculate_async_asgi(self, valid_payload):
+        url = reverse("api:fires-calculate-async")
+        response = async_to_sync(AsyncClient().post)(
+            url, valid_payload, content_type="application/json"
+        )
+        assert response.status_code == 200
+        assert response.json()["fires_calculate_result"] == Fires.calculate(
+            valid_payload
+        )
+
+    @pytest.mark.parametrize("payload", [{}, "{"])
+    def test_calculate_async_invalid(self, client, payload):
+        url = reverse("api:fires-calculate-async")
+        if isinstance(payload, dict):
+            payload = json.dumps(payload)
+        response = client.post(url, payload, content_type="application/json")
+        assert response.status_code == 400
+
+    def test_calculate_async_method(self, client):
+        response = client.get(reverse("api:fires-calculate-async"))
+        assert response.status_code == 405
+
+
+@pytest.fixture
+def job_queue():
+    jobs.get_queue.cache_clear()
+    yield jobs.get_queue()
+    jobs.get_queue.cache_clear()
+
+
+class TestFiresJobs:
+    def submit(self, client, kind, payload):
+        url = reverse("api:fires-jobs")
+        data = {"kind": kind, "input": payload}
+        return client.post(url, data, content_type="application/json")
+
+    def test_job(self, admin_client, valid_payload, job_queue):
+        payload = {**valid_payload, "paths": 500, "seed": 42}
+        response = self.submit(admin_client, "monte_carlo", payload)
+        assert response.status_code == 202
+        assert response.data["status"] == "queued"
+        assert "result" not in response.data
+        url = response.data["url"]
+        assert response["Location"] == url
+
+        assert job_queue.join(timeout=10)
+        response = admin_client.get(url)
+        assert response.status_code == 200
+        assert response.data["status"] == "done"
+        assert response.data["started"] >= response.data["submitted"]
+        expected = admin_client.post(reverse("api:fires-monte-carlo"), payload)
+        assert response.data["result"] == expected.json()
+
+    def test_job_sweep(self, admin_client, valid_payload, job_queue):
+        x = {"field": "expenses_per_year", "start": 20000, "stop": 40000, "steps": 5}
+        y = {"field": "portfolio_value", "start": 1, "stop": 500000, "steps": 4}
+        payload = {**valid_payload, "x": x, "y": y}
+        response = self.submit(admin_client, "sweep", payload)
+        assert job_queue.join(timeout=10)
+        job = admin_client.get(response.data["url"]).data
+        expected = Fires.sweep(valid_payload, x, y)
+        assert job["result"]["fires_sweep_result"] == expected
+
+    @pytest.mark.parametrize(
+        "kind,payload,error",
+        [
+            ("calculate", {}, "kind"),
+            ("monte_carlo", {"paths": 0}, "input"),
+            ("monte_carlo", {"paths": 100001}, "input"),
+            ("sweep", {"birth_year": 1984}, "input"),
+        ],
+    )
+    def test_job_invalid(self, admin_client, valid_payload, kind, payload, error):
+        response = self.submit(admin_client, kind, {**valid_payload, **payload})
+        assert response.status_code == 400
+        assert error in response.data
+
+    def test_job_paths(self, valid_payload):
+        # More paths than a request may simulate
+        data = {"kind": "monte_carlo", "input": {**valid_payload, "paths": 100000}}
+        assert FiresJobSerializer(data=data).is_valid()
+        serializer = FiresMonteCarloSerializer(data=data["input"])
+        assert not serializer.is_valid()
+        assert "paths" in serializer.errors
+
+    def test_job_failed(self, admin_client, valid_payload, job_queue, monkeypatch):
+        def fail(kind, data):
+            raise ValueError("Out of paths")
+
+        monkeypatch.setattr(jobs, "run", fail)
+        response = self.submit(admin_client, "monte_carlo", valid_payload)
+        assert job_queue.join(timeout=10)
+        job = admin_client.get(response.data["url"]).data
+        assert job["status"] == "failed"
+        assert job["error"] == "Out of paths"
+        assert job["result"] is None
+
+    def test_job_not_found(self, admin_client):
+        for name in ["api:fires-job", "api:fires-job-stream"]:
+            url = reverse(name, kwargs={"job_id": "0" * 32})
+            assert admin_client.get(url).status_code == 404
+
+    def test_job_stream(self, admin_client, valid_payload, job_queue):
+        payload = {**valid_payload, "paths": 500, "seed": 42}
+        job_id = self.submit(admin_client, "monte_carlo", payload).data["id"]
+        url = reverse("api:fires-job-stream", kwargs={"job_id": job_id})
+        response = admin_client.get(url)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        updates = [json.loads(line) for line in lines]
+        assert updates[-1]["status"] == "done"
+        assert updates[-1]["result"]["fires_monte_carlo_result"]["paths"] == 500
+        assert all("result" not in update for update in updates[:-1])
+
+    def test_job_stream_duration(self, admin_client, job_queue, settings, monkeypatch):
+        settings.FIRES_JOB_STREAM_DURATION = 0
+        # Queued, but never run
+        monkeypatch.setattr(job_queue, "push", lambda job_id: None)
+        job_id = job_queue.submit("monte_carlo", {})["id"]
+        url = reverse("api:fires-job-stream", kwargs={"job_id": job_id})
+        response = admin_client.get(url)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        assert [json.loads(line)["status"] for line in lines] == ["queued"]
+
+    def test_job_metrics(self, admin_client, client, valid_payload, job_queue):
+        url = reverse("api:fires-job-metrics")
+        assert client.get(url).status_code == 403
+        metrics = admin_client.get(url).data
+        assert metrics["depth"] == 0
+        assert metrics["wait"] is None
+
+        for _ in range(3):
+            self.submit(admin_client, "monte_carlo", {**valid_payload, "paths": 10})
+        assert job_queue.join(timeout=10)
+        metrics = admin_client.get(url).data
+        assert metrics["depth"] == 0
+        assert metrics["submitted"] == metrics["done"] == 3
+        assert metrics["failed"] == 0
+        assert 0 <= metrics["wait"]["p50"] <= metrics["wait"]["max"]
+        assert 0 < metrics["run"]["mean"] <= metrics["run"]["max"]
+
+    def test_run_jobs_without_redis(self, job_queue):
+        with pytest.raises(CommandError):
+            call_command("run_jobs", "--burst")
+
+
+class TestFiresBatch:
+    def test_batch(self, admin_client, valid_payload, valid_payload_result):
+        url = reverse("api:fires-batch")
+        payloads = [
+            valid_payload,
+            {**valid_payload, "portfolio_value": -1},
+            {**valid_payload, "summary_only": True},
+            {**valid_payload, "expenses_per_year": 50000, "portfolio_value": 1},
+        ]
+        response = admin_client.post(url, payloads, content_type="application/json")
+        assert response.status_code == 200
+        assert len(response.data) == len(payloads)
+        for index in [0, 2, 3]:
+            expected = Fires.calculate(
+                payloads[index], engine="summary" if index == 2 else "iterative"
+            )
+            assert response.data[index]["fires_calculate_result"] == expected
+        assert "portfolio_value" in response.data[1]
+        result = response.data[0]["fires_calculate_result"]
+        assert result["months"] == valid_payload_result["months"]
+
+    def test_batch_matches_calculate(self, client, valid_payload):
+        payloads = [
+            valid_payload,
+            {
+                **valid_payload,
+                "income_gross_per_year": 50006,
+                "portfolio_percentage_per_year": 0,
+                "inflation_percentage_per_year": 0,
+            },
+            {
+                **valid_payload,
+                "birth_year": 2019,
+                "years_duration": 67,
+                "income_gross_per_year": 46998,
+                "expenses_per_year": 169816,
+                "portfolio_value": 890753,
+                "portfolio_percentage_per_year": 51.01,
+                "inflation_percentage_per_year": 0,
+            },
+            {**valid_payload, "graph_format": "columns", "max_points": 25},
+        ]
+        response = client.post(
+            reverse("api:fires-batch"), payloads, content_type="application/json"
+        )
+        for payload, item in zip(payloads, response.data):
+            expected = client.post(reverse("api:fires-calculate"), payload).data
+            assert item == {
+                "fires_calculate_result": expected["fires_calculate_result"]
+            }
+
+    @pytest.mark.parametrize("payloads", [{}, [{}] * 101])
+    def test_batch_invalid(self, admin_client, payloads):
+        url = reverse("api:fires-batch")
+        response = admin_client.post(url, payloads, content_type="application/json")
+        assert response.status_code == 400
+
+    def test_calculate_many(self, valid_payload):
+        payloads = [
+            {**valid_payload, "expenses_per_year": expenses}
+            for expenses in range(10000, 60000, 5000)
+        ]
+        for engine in ["iterative", "vectorized", "summary"]:
+            assert Fires.calculate_many(payloads, engine) == [
+                Fires.calculate(payload, engine) for payload in payloads
+            ]
+
+
+class TestFiresSweep:
+    def test_sweep(self, admin_client, valid_payload):
+        url = reverse("api:fires-sweep")
+        x = {
+            "field": "portfolio_percentage_per_year",
+            "start": 0,
+            "stop": 10,
+            "steps": 3,
+        }
+        y = {"field": "expenses_per_year", "start": 25000, "stop": 50000, "steps": 2}
+        response = admin_client.post(
+            url, {**valid_payload, "x": x, "y": y}, content_type="application/json"
+        )
+        assert response.status_code == 200
+        result = response.data["fires_sweep_result"]
+        assert result["x"]["values"] == [0, 5, 10]
+        assert result["y"]["values"] == [25000, 50000]
+        for i, x_value in enumerate(result["x"]["values"]):
+            for j, y_value in enumerate(result["y"]["values"]):
+                payload = {**valid_payload, x["field"]: x_value, y["field"]: y_value}
+                expected = Fires.calculate(payload)
+                assert result["months"][i][j] == expected["months"]
+                assert result["age"][i][j] == expected["age"]
+        assert result["months"][2][0] == 141
+        assert result["months"][0][1] is None
+
+        # The swept fields are not required
+        payload = {**valid_payload, "x": x, "y": y}
+        del payload[x["field"]], payload[y["field"]]
+        response = admin_client.post(url, payload, content_type="application/json")
+        assert response.status_code == 200
+        assert response.data["fires_sweep_result"] == result
+
+    @pytest.mark.parametrize(
+        "x,y",
+        [
+            (
+                {"field": "expenses_per_year", "start": 1, "stop": 2, "steps": 2},
+                {"field": "expenses_per_year", "start": 1, "stop": 2, "steps": 2},
+            ),
+            (
+                {"field": "birth_year", "start": 1950, "stop": 2000, "steps": 2},
+                {"field": "expenses_per_year", "start": 1, "stop": 2, "steps": 2},
+            ),
+            (
+                {"field": "expenses_per_year", "start": 0, "stop": 2, "steps": 2},
+                {"field": "portfolio_value", "start": 1, "stop": 2, "steps": 2},
+            ),
+            (
+                {"field": "expenses_per_year", "start": 1, "stop": 2, "steps": 201},
+                {"field": "portfolio_value", "start": 1, "stop": 2, "steps": 2},
+            ),
+        ],
+    )
+    def test_sweep_invalid(self, admin_client, valid_payload, x, y):
+        url = reverse("api:fires-sweep")
+        response = admin_client.post(
+            url, {**valid_payload, "x": x, "y": y}, content_type="application/json"
+        )
+        assert response.status_code == 400
+
+    def test_sweep_large_grid(self, valid_payload):
+        x = {"field": "portfolio_percentage_per_year", "start": -10, "stop": 20}
+        y = {"field": "inflation_percentage_per_year", "start": -5, "stop": 15}
+        result = Fires.sweep(valid_payload, {**x, "steps": 200}, {**y, "steps": 200})
+        assert len(result["months"]) == 200
+        assert all(len(row) == 200 for row in result["months"])
+
+    @pytest.mark.parametrize("backend", ["inline", "thread", "process"])
+    def test_sweep_backends(self, valid_payload, backend):
+        x = {"field": "portfolio_percentage_per_year", "start": -10, "stop": 20}
+        y = {"field": "inflation_percentage_per_year", "start": -5, "stop": 15}
+        x, y = {**x, "steps": 120}, {**y, "steps": 150}
+        result = Fires.sweep(valid_payload, x, y)
+        backend = BACKENDS[backend](2)
+        try:
+            assert Fires.sweep(valid_payload, x, y, backend=backend) == result
+        finally:
+            backend.shutdown()
+
+    def test_sweep_chunks(self, valid_payload):
+        # Every row of the grid is a separate chunk
+        x = {"field": "expenses_per_year", "start": 20000, "stop": 40000, "steps": 3}
+        y = {"field": "portfolio_value", "start": 1, "stop": 10000000}
+        y = {**y, "steps": SWEEP_CHUNK_SCENARIOS}
+        result = Fires.sweep(valid_payload, x, y)
+        for row, expenses in enumerate(result["x"]["values"]):
+            for column in [0, SWEEP_CHUNK_SCENARIOS - 1]:
+                payload = {
+                    **valid_payload,
+                    "expenses_per_year": expenses,
+                    "portfolio_value": result["y"]["values"][column],
+                }
+                expected = Fires.calculate(payload, engine="summary")["months"]
+                assert result["months"][row][column] == expected
+
+
+class TestFiresSensitivity:
+    def test_sensitivity(self, admin_client, valid_payload, valid_payload_result):
+        url = reverse("api:fires-sensitivity")
+        response = admin_client.post(url, valid_payload)
+        assert response.status_code == 200
+        result = response.data["fires_sensitivity_result"]
+        assert result["months"] == valid_payload_result["months"]
+        assert list(result["fields"]) == list(SENSITIVITY_STEPS)
+
+        for field, sensitivity in result["fields"].items():
+            low, high = sensitivity["values"]
+            assert low < valid_payload[field] < high
+            for value, months in zip(sensitivity["values"], sensitivity["months"]):
+                payload = {**valid_payload, field: value}
+                assert months == Fires.calculate(payload)["months"]
+            below, above = sensitivity["months"]
+            assert sensitivity["months_per_unit"] == pytest.approx(
+                (above - below) / (high - low)
+            )
+
+        # Retiring later with higher expenses, earlier with higher returns
+        assert result["fields"]["expenses_per_year"]["months_per_unit"] > 0
+        assert result["fields"]["portfolio_percentage_per_year"]["months_per_unit"] < 0
+
+    def test_sensitivity_bounds(self, valid_payload):
+        payload = {**valid_payload, "inflation_percentage_per_year": -100}
+        result = Fires.sensitivity(payload)
+        inflation = result["fields"]["inflation_percentage_per_year"]
+        assert inflation["values"] == [-100, pytest.approx(-99.9)]
+
+    @pytest.mark.parametrize(
+        "extremes",
+        [
+            {"max_withdrawal_percentage_per_year": 1, "portfolio_value": 1},
+            {
+                "max_withdrawal_percentage_per_year": 10,
+                "portfolio_percentage_per_year": 100,
+                "inflation_percentage_per_year": 100,
+            },
+        ],
+    )
+    def test_sensitivity_valid(self, valid_payload, extremes):
+        payload = {**valid_payload, **extremes}
+        result = Fires.sensitivity(payload)
+        for field, sensitivity in result["fields"].items():
+            low, high = sensitivity["values"]
+            assert low <= payload[field] <= high and low < high
+            for value in sensitivity["values"]:
+                serializer = FiresInputSerializer(data={**payload, field: value})
+                assert serializer.is_valid(), serializer.errors
+
+    def test_sensitivity_bounds_fields(self):
+        fields = FiresInputSerializer().fields
+        for field, bounds in SENSITIVITY_BOUNDS.items():
+            assert bounds == (fields[field].min_value, fields[field].max_value)
+
+    def test_sensitivity_never(self, valid_payload):
+        payload = {**valid_payload, "expenses_per_year": 50000, "portfolio_value": 1}
+        payload["portfolio_percentage_per_year"] = 0
+        result = Fires.sensitivity(payload)
+        assert result["months"] is None
+        for sensitivity in result["fields"].values():
+            assert sensitivity["months_per_unit"] is None
+
+    def test_sensitivity_invalid(self, admin_client, valid_payload):
+        url = reverse("api:fires-sensitivity")
+        response = admin_client.post(url, {**valid_payload, "portfolio_value": 0})
+        assert response.status_code == 400
+        assert "portfolio_value" in response.data
+
+
+class TestFiresGoalSeek:
+    @pytest.mark.parametrize("field", GOAL_FIELDS)
+    def test_goal_seek(self, admin_client, valid_payload, field):
+        url = reverse("api:fires-goal-seek")
+        payload = {**valid_payload, "field": field, "target_months": 120}
+        response = admin_client.post(url, payload)
+        assert response.status_code == 200
+        result = response.data["fires_goal_seek_result"]
+        assert result["field"] == field
+        assert result["iterations"] <= 8
+
+        # The solved value reaches the target, a value just beyond doesn't
+        value = result["value"]
+        precision = GOAL_FIELDS[field][2]
+        beyond = (
+            value + precision if field == "expenses_per_year" else value - precision
+        )
+        months = Fires.calculate({**valid_payload, field: value})["months"]
+        assert months == result["months"] <= 120
+        months = Fires.calculate({**valid_payload, field: beyond})["months"]
+        assert months is None or months > 120
+
+    def test_goal_seek_age(self, admin_client, valid_payload):
+        url = reverse("api:fires-goal-seek")
+        age = Fires.calculate(valid_payload)["age"] + 1
+        payload = {**valid_payload, "field": "expenses_per_year", "target_age": age}
+        response = admin_client.post(url, payload)
+        assert response.status_code == 200
+        result = response.data["fires_goal_seek_result"]
+        # Up to the last month of the target age
+        assert result["age"] == age
+        assert result["value"] > valid_payload["expenses_per_year"]
+
+    def test_goal_seek_optional(self, admin_client, valid_payload):
+        # The input value of the solved field isn't needed
+        url = reverse("api:fires-goal-seek")
+        del valid_payload["portfolio_value"]
+        payload = {**valid_payload, "field": "portfolio_value", "target_months": 1}
+        response = admin_client.post(url, payload)
+        assert response.status_code == 200
+        assert response.data["fires_goal_seek_result"]["months"] == 1
+
+    def test_goal_seek_unreachable(self, valid_payload):
+        # Returns don't make up for the lack of income in a single month
+        payload = {**valid_payload, "income_gross_per_year": 1}
+        result = Fires.goal_seek(payload, "portfolio_percentage_per_year", 1)
+        assert result["value"] is None
+        assert result["months"] is None
+        assert result["age"] is None
+
+    @pytest.mark.parametrize(
+        "payload",
+        [
+            {"field": "inflation_percentage_per_year", "target_months": 120},
+            {"field": "expenses_per_year"},
+            {"field": "expenses_per_year", "target_months": 120, "target_age": 50},
+            {"field": "expenses_per_year", "target_months": 1201},
+            {"field": "expenses_per_year", "target_age": 20},
+        ],
+    )
+    def test_goal_seek_invalid(self, admin_client, valid_payload, payload):
+        url = reverse("api:fires-goal-seek")
+        response = admin_client.post(url, {**valid_payload, **payload})
+        assert response.status_code == 400
+
+
+class TestFiresMonteCarlo:
+    def test_monte_carlo(self, admin_client, valid_payload):
+        url = reverse("api:fires-monte-carlo")
+        payload = {**valid_payload, "paths": 500, "seed": 42}
+        response = admin_client.post(url, payload)
+        assert response.status_code == 200
+        result = response.data["fires_monte_carlo_result"]
+        assert result["paths"] == 500
+        assert 0 <= result["success_probability"] <= 1
+        assert result["months"]["p5"] <= result["months"]["p50"]
+        assert len(result["graph_years"]) == 100
+        for year in result["graph_years"]:
+            assert year["p5"] <= year["p50"] <= year["p95"]
+
+        # Results are reproducible with the same seed
+        assert admin_client.post(url, payload).data == response.data
+
+    @pytest.mark.parametrize("distribution", ["normal", "lognormal"])
+    def test_monte_carlo_without_variation(
+        self, valid_payload, valid_payload_result, distribution
+    ):
+        result = Fires.monte_carlo(
+            valid_payload,
+            100,
+            seed=1,
+            return_std=0,
+            inflation_std=0,
+            distribution=distribution,
+        )
+        months = valid_payload_result["months"]
+        assert result["success_probability"] == 1
+        assert result["months"] == {"p5": months, "p50": months, "p95": months}
+
+    @pytest.mark.parametrize("backend", ["inline", "thread", "process"])
+    def test_monte_carlo_backends(self, valid_payload, backend):
+        result = Fires.monte_carlo(valid_payload, 25000, seed=1)
+        backend = BACKENDS[backend](2)
+        try:
+            assert Fires.monte_carlo(valid_payload, 25000, seed=1, backend=backend) == (
+                result
+            )
+        finally:
+            backend.shutdown()
+
+    @pytest.mark.parametrize(
+        "variable,invalid_value",
+        [
+            ("paths", 0),
+            ("paths", 20001),
+            ("seed", -1),
+            ("distribution", "uniform"),
+            ("portfolio_percentage_std", -1),
+        ],
+    )
+    def test_monte_carlo_invalid_data(
+        self, admin_client, valid_payload, variable, invalid_value
+    ):
+        url = reverse("api:fires-monte-carlo")
+        response = admin_client.post(url, {**valid_payload, variable: invalid_value})
+        assert response.status_code == 400
+
+
+@pytest.fixture
+def historical_data(settings, tmp_path):
+    """Constant returns (10%) and inflation (2%), for 125 years."""
+    path = tmp_path / "historical.bin"
+    months = 1500
+    returns = [1.1 ** (1 / 12)] * months
+    cpi = [1.02 ** (month / 12) for month in range(months)]
+    historical.write(path, 1900, 1, returns, cpi)
+    settings.FIRES_HISTORICAL_DATA = str(path)
+    return path
+
+
+class TestFiresBacktest:
+    def test_backtest(
+        self, admin_client, valid_payload, valid_payload_result, historical_data
+    ):
+        url = reverse("api:fires-backtest")
+        response = admin_client.post(url, valid_payload)
+        assert response.status_code == 200
+        result = response.data["fires_backtest_result"]
+        assert result["windows"] == 1499
+        assert result["first_start"] == "1900-01"
+        assert result["last_start"] == "2024-11"
+        months = valid_payload_result["months"]
+        assert result["months"]["min"] == result["months"]["max"] == months
+        assert result["depleted"] == 0
+
+    def test_backtest_depleted(self, valid_payload, tmp_path):
+        path = tmp_path / "crash.bin"
+        returns = [1.1 ** (1 / 12)] * 200 + [0.5] + [1] * 400
+        historical.write(path, 2000, 1, returns, [100] * len(returns))
+        result = Fires.backtest(valid_payload, str(path))
+        assert result["depleted"] > 0
+        assert result["worst"]["depleted_month"] is not None
+
+    def test_backtest_unavailable(self, admin_client, valid_payload, settings):
+        settings.FIRES_HISTORICAL_DATA = "/nonexistent/historical.bin"
+        url = reverse("api:fires-backtest")
+        response = admin_client.post(url, valid_payload)
+        assert response.status_code == 503
+
+    def test_backtest_disabled(self, admin_client, valid_payload, settings):
+        settings.FIRES_HISTORICAL_DATA = ""
+        url = reverse("api:fires-backtest")
+        response = admin_client.post(url, valid_payload)
+        assert response.status_code == 404
+
+    def test_build_historical_data(self, tmp_path):
+        source = tmp_path / "source.csv"
+        source.write_text("date,return,cpi\n1950-06,1.5,24.1\n1950-07,-2,24.3\n")
+        output = tmp_path / "data" / "historical.bin"
+        call_command("build_historical_data", str(source), output=str(output))
+        dataset = historical.load(str(output))
+        assert dataset.date(1) == "1950-07"
+        assert list(dataset.returns) == [1.015, 0.98]
+        assert list(dataset.cpi) == [24.1, 24.3]
+
+    def test_build_historical_data_errors(self, tmp_path):
+        with pytest.raises(CommandError, match="Cannot read"):
+            call_command(
+                "build_historical_data",
+                str(tmp_path / "missing.csv"),
+                output=str(tmp_path / "historical.bin"),
+            )
+
+        source = tmp_path / "source.csv"
+        source.write_text("date,return,cpi\n1950-06,1.5,24.1\n")
+        with pytest.raises(CommandError, match="FIRES_HISTORICAL_DATA"):
+            call_command("build_historical_data", str(source), output="")
+        with pytest.raises(CommandError, match="Cannot write"):
+            call_command("build_historical_data", str(source), output=str(source / "x"))
+
+
+class TestEngines:
+    @pytest.mark.parametrize(
+        "changes",
+        [
+            {},
+            {"portfolio_value": 10000000},
+            {
+                "expenses_per_year": 50000,
+                "portfolio_value": 1,
+                "portfolio_percentage_per_year": 0,
+            },
+            {"inflation_percentage_per_year": -3, "expenses_per_year": 60000},
+            {"inflation_percentage_per_year": 8, "portfolio_percentage_per_year": -5},
+            {"portfolio_percentage_per_year": -100, "years_duration": 99},
+            {"inflation_percentage_per_year": -100},
+            # Fractional savings without growth, rounded at .5 along the way
+            {
+                "income_gross_per_year": 50006,
+                "portfolio_percentage_per_year": 0,
+                "inflation_percentage_per_year": 0,
+            },
+            # Yearly totals beyond int64, of months within it
+            {
+                "birth_year": 2019,
+                "years_duration": 67,
+                "income_gross_per_year": 46998,
+                "expenses_per_year": 169816,
+                "portfolio_value": 890753,
+                "portfolio_percentage_per_year": 51.01,
+                "inflation_percentage_per_year": 0,
+                "max_withdrawal_percentage_per_year": 4,
+            },
+        ],
+    )
+    def test_vectorized_matches_iterative(self, valid_payload, changes):
+        payload = {**valid_payload, **changes}
+        expected = Fires.calculate(payload)
+        assert Fires.calculate(payload, engine="vectorized") == expected
+
+    @pytest.mark.parametrize("seed", range(100))
+    def test_vectorized_matches_iterative_random(self, seed):
+        rng = random.Random(seed)
+
+        def rate():
+            # Often without growth or inflation, sometimes extreme
+            return rng.choice(
+                [0, round(rng.uniform(-20, 20), 2), round(rng.uniform(-100, 100), 2)]
+            )
+
+        payload = {
+            "birth_year": rng.randint(1900, 2021),
+            "years_duration": rng.randint(1, 99),
+            "income_gross_per_year": rng.randint(1, 300000),
+            "expenses_per_year": rng.randint(1, 200000),
+            "portfolio_value": rng.randint(1, 3000000),
+            "portfolio_percentage_per_year": rate(),
+            "inflation_percentage_per_year": rate(),
+            "max_withdrawal_percentage_per_year": round(rng.uniform(1, 10), 1),
+        }
+        expected = Fires.calculate(payload)
+        assert Fires.calculate(payload, engine="vectorized") == expected
+        payloads = [payload, {**payload, "expenses_per_year": 1}]
+        assert Fires.calculate_many(payloads, engine="vectorized") == [
+            Fires.calculate(payload) for payload in payloads
+        ]
+
+    def test_vectorized_result(self, valid_payload, valid_payload_result):
+        result = Fires.calculate(valid_payload, engine="vectorized")
+        for variable in ["cost_of_living", "portfolio", "months"]:
+            assert result[variable] == valid_payload_result[variable]
+
+    @pytest.mark.parametrize("seed", range(100))
+    def test_summary_matches_iterative(self, seed):
+        rng = random.Random(seed)
+
+        def rate():
+            # Often without growth or inflation
+            return rng.choice([0, round(rng.uniform(-100, 100), 1)])
+
+        payload = {
+            "birth_year": rng.randint(1900, 2021),
+            "years_duration": rng.randint(1, 99),
+            "income_gross_per_year": rng.randint(1, 300000),
+            "expenses_per_year": rng.randint(1, 200000),
+            "portfolio_value": rng.randint(1, 3000000),
+            "portfolio_percentage_per_year": rate(),
+            "inflation_percentage_per_year": rate(),
+            "max_withdrawal_percentage_per_year": round(rng.uniform(1, 10), 1),
+        }
+        expected = Fires.calculate(payload)
+        result = Fires.calculate(payload, engine="summary")
+        for variable in ["cost_of_living", "portfolio", "months", "years", "age"]:
+            assert result[variable] == expected[variable]
+
+    def test_summary_matches_iterative_without_growth(self, valid_payload):
+        payload = {
+            **valid_payload,
+            "income_gross_per_year": 244141,
+            "expenses_per_year": 126466,
+            "portfolio_value": 1028715,
+            "portfolio_percentage_per_year": 0,
+            "inflation_percentage_per_year": 0,
+        }
+        expected = Fires.calculate(payload)
+        result = Fires.calculate(payload, engine="summary")
+        assert result["portfolio"] == expected["portfolio"] == 3166478
+        assert result["months"] == expected["months"]
+
+    @pytest.mark.parametrize("engine", ["iterative", "vectorized", "summary"])
+    def test_columnar(self, valid_payload, engine):
+        rows = Fires.calculate(valid_payload, engine)
+        columns = Fires.calculate(valid_payload, engine, columnar=True)
+        assert columns["graph_months"] == {
+            variable: [month[variable] for month in rows["graph_months"]]
+            for variable in ["portfolio", "interest", "change"]
+        }
+        assert columns["graph_years"] == {
+            variable: [year[variable] for year in rows["graph_years"]]
+            for variable in ["year", "portfolio", "interest", "change"]
+        }
+        assert Fires.calculate_many([valid_payload], engine, columnar=True) == [columns]
+
+    def test_unknown_engine(self, valid_payload):
+        with pytest.raises(ValueError):
+            Fires.calculate(valid_payload, engine="unknown")
+
+    @pytest.mark.parametrize("engine", ["iterative", "vectorized", "summary"])
+    def test_results_as_dict(self, valid_payload, engine):
+        calculator = ENGINES[engine].batch([UserInfo(valid_payload)])[0]
+        calculator.run()
+        result = calculator.results_as_dict()
+        assert result == asdict(calculator.result)
+        assert result["graph_months"] is calculator.result.graph_months
+
+
+class TestRates:
+    def test_monthly_factors(self):
+        # Looked up, identical to the factors of UserInfo
+        percentages = [-100, -12.34, 0, 2, 2.55, 99.99, 100]
+        factors = rates.monthly_factors(percentages)
+        assert factors.tolist() == [rates.monthly_factor(p) for p in percentages]
+
+        # Calculated
+        percentages = [3.14159, 250]
+        factors = rates.monthly_factors(percentages)
+        assert factors.tolist() == pytest.approx(
+            [rates.monthly_factor(p) for p in percentages]
+        )
+        assert rates.monthly_factors(4) == (1 + 4 / 100) ** (1 / 12)
+
+    @pytest.mark.parametrize("shared", [True, False])
+    def test_tabulate(self, shared):
+        factors = np.linspace(0.99, 1.01, 50).reshape(-1, 1)
+        if shared:
+            factors = np.round(factors, 2)
+        count = np.minimum(np.arange(1, 201), np.arange(50).reshape(-1, 1) + 100)
+        for function, arguments in [
+            (np.power, [factors]),
+            (vectorized.power_sum, [factors, 1.0]),
+            (vectorized.power_sum, [factors, factors[::-1]]),
+        ]:
+            expected = function(*arguments, count)
+            result = rates.tabulate(function, arguments, count)
+            np.testing.assert_array_equal(result, expected)
+
+
+class TestSampling:
+    @pytest.mark.parametrize("count", [1, 2, 7, 100, 1200])
+    @pytest.mark.parametrize("max_points", [3, 4, 25, 1200])
+    def test_sampler(self, count, max_points):
+        keys = np.random.default_rng(count).integers(0, 10, count)
+        pinned = count // 3
+        sampler = sampling.Sampler(max_points)
+        for position, key in enumerate(keys.tolist()):
+            sampler.add((key,), pin=position == pinned)
+        positions = [position for position, _ in sampler.points()]
+        assert len(positions) <= max(max_points, 3)
+        assert pinned in positions
+        assert positions == sampling.sample(keys, max_points, pinned).tolist()
+
+
+class TestRenderers:
+    @pytest.mark.parametrize("name", list(renderers.ENCODERS))
+    @pytest.mark.parametrize("graph_format", ["rows", "columns"])
+    def test_encoders(self, valid_payload, name, graph_format):
+        encode = renderers.ENCODERS[name]
+        if encode is None:
+            pytest.skip(f"{name} is not installed")
+        serializer = FiresCalculateSerializer(
+            data={**valid_payload, "graph_format": graph_format}
+        )
+        serializer.is_valid(raise_exception=True)
+        assert encode(serializer.data) == JSONRenderer().render(serializer.data)
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            [{"a": 1, "b": 2.5}, {"a": -3, "b": 1e16}],
+            {"rows": [{"a": 1}, {"a": True}], "mixed": [{"a": 1}, {"b": 1}]},
+            {"nested": {"rows": [{"a": 1, "b": 2}] * 3}, "other": [1, "a", None]},
+            [{"a": 1.5}, {"a": 2}],
+            [],
+        ],
+    )
+    def test_encode_python(self, data):
+        assert renderers.encode_python(data) == JSONRenderer().render(data)
+
+    def test_encode_python_without_rows(self, monkeypatch):
+        calls = []
+        encode_drf = renderers.encode_drf
+        monkeypatch.setattr(
+            renderers, "encode_drf", lambda data: calls.append(data) or encode_drf(data)
+        )
+        data = {"summary": {"months": 141}, "other": [1, "a", None]}
+        assert renderers.encode_python(data) == JSONRenderer().render(data)
+        assert calls == [data]
+        renderers.encode_python([{"a": 1}, {"a": 2}])
+        assert len(calls) == 1
+
+    def test_encode_python_nan(self):
+        with pytest.raises(ValueError):
+            renderers.encode_python([{"a": float("nan")}, {"a": 1.0}])
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            {"value": decimal.Decimal("1.5")},
+            {"line": "\u2028\u2029"},
+            None,
+        ],
+    )
+    def test_render(self, data):
+        renderer = renderers.FiresJSONRenderer()
+        assert renderer.render(data) == JSONRenderer().render(data)
+        media_type = "application/json; indent=2"
+        expected = JSONRenderer().render(data, media_type)
+        assert renderer.render(data, media_type) == expected
+
+    def test_calculate(self, client, valid_payload):
+        response = client.post(reverse("api:fires-calculate"), valid_payload)
+        assert response["Content-Type"] == "application/json"
+        assert response.content == JSONRenderer().render(response.data)
+
+
+class TestFiresGraphRenderer:
+    @pytest.mark.parametrize("graph_format", ["rows", "columns"])
+    def test_calculate(self, client, valid_payload, graph_format):
+        url = reverse("api:fires-calculate")
+        payload = {**valid_payload, "graph_format": graph_format}
+        response = client.post(url, payload, HTTP_ACCEPT="application/octet-stream")
+        assert response.status_code == 200
+        assert response["Content-Type"] == "application/octet-stream"
+        summary, arrays = renderers.unpack_graph(response.content)
+
+        expected = client.post(url, {**payload, "graph_format": "columns"}).data
+        result = expected["fires_calculate_result"]
+        months, years = result.pop("graph_months"), result.pop("graph_years")
+        assert summary == {**expected, "graph_format": graph_format}
+        for dataset, columns in [("graph_months", months), ("graph_years", years)]:
+            for field, values in columns.items():
+                assert arrays[f"{dataset}.{field}"].tolist() == values
+        assert arrays["graph_months.portfolio"].format == "i"
+        assert arrays["graph_years.year"].format == "d"
+
+    def test_calculate_v2(self, client, valid_payload):
+        url = reverse("api:fires-v2-calculate") + "?format=bin"
+        response = client.post(url, valid_payload)
+        summary, arrays = renderers.unpack_graph(response.content)
+        assert summary["months"] == 141
+        assert len(arrays["graph_months.change"]) > 141
+
+    def test_calculate_invalid(self, client, valid_payload):
+        response = client.post(
+            reverse("api:fires-v2-calculate"),
+            {**valid_payload, "birth_year": 1800},
+            HTTP_ACCEPT="application/octet-stream",
+        )
+        assert response.status_code == 400
+        summary, arrays = renderers.unpack_graph(response.content)
+        assert "birth_year" in summary
+        assert arrays == {}
+
+    def test_pack_values(self):
+        assert renderers.pack_values([1, -(2 ** 31)]).typecode == "i"
+        assert renderers.pack_values([1, 2 ** 31]).typecode == "q"
+        assert renderers.pack_values([2 ** 70]).typecode == "d"
+        assert renderers.pack_values([1.5]).typecode == "d"
+        assert renderers.pack_values([1.5]).tobytes() == struct.pack("<d", 1.5)
+
+
+class PlainCalculateSerializer(FiresCalculateSerializer):
+    """Without compiled schema (get_fields is overridden)."""
+
+    def get_fields(self):
+        return super().get_fields()
+
+
+class TestCompiled:
+    def validate(self, data):
+        results = []
+        for serializer_class in [FiresCalculateSerializer, PlainCalculateSerializer]:
+            serializer = serializer_class(data=data)
+            valid = serializer.is_valid()
+            results.append(
+                (valid, serializer.validated_data, serializer.errors)
+                if not valid
+                else (valid, serializer.validated_data, dict(serializer.data))
+            )
+        return results
+
+    def test_supported(self):
+        assert compiled(FiresCalculateSerializer) is not None
+        assert compiled(PlainCalculateSerializer) is None
+        # Fields depend on the input
+        assert compiled(FiresGoalSeekSerializer) is None
+
+    @pytest.mark.parametrize(
+        "changes",
+        [
+            {},
+            {"summary_only": True, "graph_format": "columns", "max_points": 10},
+            {"portfolio_percentage_per_year": 2.55, "inflation_percentage_per_year": 0},
+            {"currency": " EUR "},
+            {"birth_year": 1984.0, "summary_only": "true"},
+        ],
+    )
+    def test_valid(self, valid_payload, changes):
+        compiled_result, plain_result = self.validate({**valid_payload, **changes})
+        assert compiled_result[0] is True
+        assert compiled_result == plain_result
+        for value, expected in zip(
+            compiled_result[1].values(), plain_result[1].values()
+        ):
+            assert type(value) is type(expected)
+
+    @pytest.mark.parametrize(
+        "changes",
+        [
+            {"birth_year": 1800},
+            {"birth_year": None, "currency": ""},
+            {"portfolio_percentage_per_year": "a lot"},
+            {"graph_format": "unknown"},
+            {"currency": "E\x00R"},
+            {"summary_only": 2},
+        ],
+    )
+    def test_invalid(self, valid_payload, changes):
+        compiled_result, plain_result = self.validate({**valid_payload, **changes})
+        assert compiled_result[0] is False
+        assert compiled_result == plain_result
+
+    def test_query(self, valid_payload):
+        data = QueryDict(mutable=True)
+        data.update({**valid_payload, "summary_only": "true"})
+        compiled_result, plain_result = self.validate(data)
+        assert compiled_result[0] is True
+        assert compiled_result == plain_result
+
+
+class TestBackends:
+    @pytest.mark.parametrize("backend", ["inline", "thread", "process"])
+    def test_map(self, backend):
+        backend = BACKENDS[backend](2)
+        try:
+            assert backend.map(pow, [2, 3, 4], [3, 2, 1]) == [8, 9, 4]
+        finally:
+            backend.shutdown()
+
+    def test_map_threads(self):
+        # Concurrent first calls share a single pool
+        pools = []
+
+        class Executor(ThreadPoolExecutor):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                pools.append(self)
+                time.sleep(0.01)
+
+        backend = ThreadBackend(2)
+        backend.executor_class = Executor
+        try:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                results = list(executor.map(lambda i: backend.map(abs, [-i]), range(8)))
+            assert results == [[i] for i in range(8)]
+            assert pools == [backend.executor]
+        finally:
+            backend.shutdown()
+        for pool in pools:
+            pool.shutdown()
+
+    def test_get_backend(self, settings):
+        get_backend.cache_clear()
+        settings.FIRES_EXECUTION_BACKEND = "thread"
+        settings.FIRES_EXECUTION_WORKERS = 3
+        try:
+            backend = get_backend()
+            assert isinstance(backend, ThreadBackend)
+            assert backend.workers == 3
+            assert get_backend() is backend
+        finally:
+            get_backend.cache_clear()
+
+    def test_invalid_backend(self, settings):
+        settings.FIRES_EXECUTION_BACKEND = "unknown"
+        with pytest.raises(ImproperlyConfigured):
+            apps.get_app_config("fires").ready()
+
+
+class TestBenchmark:
+    def test_benchmark(self, tmp_path):
+        output = tmp_path / "benchmark.json"
+        call_command(
+            "benchmark",
+            "--number=1",
+            "--repeat=1",
+            "--compare",
+            f"--output={output}",
+            stdout=io.StringIO(),
+        )
+        results = json.loads(output.read_text())["results"]
+        assert list(results) == ["month_1", "month_141", "never"]
+        for layers in results.values():
+            assert list(layers) == ["run", "calculate", "serializer", "request"]
+            assert all(layer["allocated"] > 0 for layer in layers.values())
+
+    def test_benchmark_renderers(self, tmp_path):
+        output = tmp_path / "benchmark.json"
+        call_command(
+            "benchmark",
+            "--number=1",
+            "--repeat=1",
+            "--layer=run",
+            "--profile=month_1",
+            "--renderers",
+            f"--output={output}",
+            stdout=io.StringIO(),
+        )
+        results = json.loads(output.read_text())["renderers"]
+        assert {"python", "drf"} <= set(results)
+        for timings in results.values():
+            assert list(timings) == ["rows", "columns"]
+
+    def test_benchmark_conversions(self, tmp_path):
+        output = tmp_path / "benchmark.json"
+        call_command(
+            "benchmark",
+            "--number=1",
+            "--repeat=1",
+            "--layer=run",
+            "--profile=never",
+            "--conversions",
+            "--compare",
+            f"--output={output}",
+            stdout=io.StringIO(),
+        )
+        conversions = json.loads(output.read_text())["conversions"]["never"]
+        assert list(conversions) == ["asdict", "to_dict"]
+        # The graph data is copied by asdict, but handed over by to_dict
+        assert conversions["to_dict"]["allocated"] * 10 < (
+            conversions["asdict"]["allocated"]
+        )
+
+    def test_benchmark_uncached(self):
+        call_command("benchmark", "--number=1", "--repeat=1", stdout=io.StringIO())
+        assert result_cache.stats()["entries"] == 0
+
+
+class TestLoadTest:
+    def test_load_test(self, live_server, tmp_path):
+        output = tmp_path / "load_test.json"
+        call_command(
+            "load_test",
+            live_server.url + reverse("api:fires-calculate"),
+            "--requests=4",
+            "--concurrency=2",
+            f"--output={output}",
+            stdout=io.StringIO(),
+        )
+        results = json.loads(output.read_text())
+        assert results["errors"] == 0
+        assert results["requests_per_second"] > 0
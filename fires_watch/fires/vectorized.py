@@ -0,0 +1,435 @@
+import itertools
+from dataclasses import dataclass
+
+import numpy as np
+
+from fires_watch.fires import rates
+
+# Maximum number of months the calculation looks into the future (100 years)
+MONTHS = 1200
+
+
+@dataclass
+class Series:
+    """
+    Monthly series for one or more scenarios, as 2D arrays.
+
+    Every array has the shape (scenarios, months), where column m holds the
+    value at the end of month m + 1. The `retirement_month` array holds the
+    first month in which the target portfolio is reached, or 0 if it never is.
+    """
+
+    expenses: np.ndarray
+    savings: np.ndarray
+    portfolio: np.ndarray
+    interest: np.ndarray
+    target: np.ndarray
+    retirement_month: np.ndarray
+
+
+def affine_scan(factor, offsets):
+    """
+    Solve x[m] = x[m - 1] * factor + offsets[m] (with x[-1] = 0) along the
+    last axis, for all scenarios at once.
+
+    The recurrence is evaluated month by month, in the same order as
+    Calculator (multiply, then add), so every value is rounded exactly like
+    the iterative calculation. Each step is a single whole-array operation
+    over the scenarios.
+    """
+    offsets = np.asarray(offsets, dtype=float)
+    factor = np.asarray(factor, dtype=float)
+    if factor.size == 1 and offsets.size == offsets.shape[-1]:
+        # A single scenario is faster in Python (with the same floats)
+        factor = float(factor.reshape(-1)[0])
+        values = itertools.accumulate(
+            offsets.reshape(-1).tolist(), lambda value, offset: value * factor + offset
+        )
+        return np.fromiter(values, float, offsets.size).reshape(offsets.shape)
+
+    columns = np.array(np.moveaxis(offsets, -1, 0))
+    product = np.empty_like(columns[0])
+    for month in range(1, len(columns)):
+        np.multiply(columns[month - 1], factor, out=product)
+        np.add(product, columns[month], out=columns[month])
+    return np.moveaxis(columns, 0, -1)
+
+
+def simulate(
+    initial_portfolio,
+    monthly_income,
+    monthly_expenses,
+    inflation_factor,
+    return_factor,
+    safe_rate,
+    months=MONTHS,
+):
+    """
+    Calculate the monthly series of Calculator.run for many scenarios at once.
+
+    All arguments are scalars or 1D arrays (one value per scenario), they are
+    broadcast against each other. The order of floating point operations
+    mirrors Calculator, so results are identical.
+    """
+    shape = np.broadcast(
+        initial_portfolio,
+        monthly_income,
+        monthly_expenses,
+        inflation_factor,
+        return_factor,
+        safe_rate,
+    ).shape
+    (
+        initial_portfolio,
+        monthly_income,
+        monthly_expenses,
+        inflation_factor,
+        return_factor,
+        safe_rate,
+    ) = (
+        np.broadcast_to(np.asarray(value, dtype=float), shape).reshape(-1, 1)
+        for value in (
+            initial_portfolio,
+            monthly_income,
+            monthly_expenses,
+            inflation_factor,
+            return_factor,
+            safe_rate,
+        )
+    )
+
+    # Expenses are inflation adjusted every month. Accumulating the factors
+    # one by one gives exactly the same values as the iterative calculation.
+    factors = np.repeat(inflation_factor, months + 1, axis=1)
+    factors[:, :1] = monthly_expenses
+    expenses = np.multiply.accumulate(factors, axis=1)[:, 1:]
+
+    # NOTE: Savings are clamped at zero (see Calculator), which makes the
+    #       portfolio recurrence piecewise. Applying the clamp to the offsets
+    #       of the recurrence (instead of to the portfolio itself) keeps it
+    #       linear, so it can still be solved as a single scan.
+    savings = np.maximum(monthly_income - expenses, 0)
+    offsets = savings.copy()
+    offsets[:, 0] += initial_portfolio[:, 0] * return_factor[:, 0]
+    portfolio = affine_scan(return_factor[:, 0], offsets)
+
+    previous = np.concatenate((initial_portfolio, portfolio[:, :-1]), axis=1)
+    interest = previous * (return_factor - 1)
+    target = expenses * 12 / safe_rate
+
+    reached = portfolio > target
+    retirement_month = np.where(reached.any(axis=1), reached.argmax(axis=1) + 1, 0)
+
+    return Series(
+        expenses=expenses,
+        savings=savings,
+        portfolio=portfolio,
+        interest=interest,
+        target=target,
+        retirement_month=retirement_month,
+    )
+
+
+def rounded(values):
+    """
+    Round values to integers, like round() does for the iterative calculation.
+
+    Returns an int64 array, or an object array of Python integers when the
+    values are too large for int64 (e.g. a century of 100% yearly returns).
+    The bound leaves room for yearly totals: a sum of 12 values stays within
+    int64 too.
+    """
+    values = np.rint(values)
+    if values.size and np.abs(values).max() * 12 >= 2 ** 63:
+        return np.array([int(value) for value in values.tolist()], dtype=object)
+    return values.astype(np.int64)
+
+
+@dataclass
+class Summary:
+    """
+    Retirement details for one or more scenarios, as 1D arrays.
+
+    The `retirement_month` array holds the first month in which the target
+    portfolio is reached, or 0 if it never is. The `portfolio` and `expenses`
+    (monthly) arrays hold the values in that month, or NaN if it is never
+    reached.
+    """
+
+    retirement_month: np.ndarray
+    portfolio: np.ndarray
+    expenses: np.ndarray
+
+
+def geometric_sum(ratio, count):
+    """
+    Sum ratio ** j for j in 0 .. count - 1, for 0 <= ratio <= 1.
+
+    Uses expm1/log so the result stays accurate for ratios close to 1, where
+    the textbook (1 - ratio ** count) / (1 - ratio) loses most of its digits.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        partial = -np.expm1(count * np.log(ratio)) / (1 - ratio)
+    return np.where(count <= 0, 0, np.where(ratio == 1, count, partial))
+
+
+def power_sum(x, y, count):
+    """Sum x ** (count - 1 - t) * y ** t for t in 0 .. count - 1 (x, y >= 0)."""
+    base = np.maximum(x, y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(base > 0, np.minimum(x, y) / base, 0)
+        partial = base ** (count - 1) * geometric_sum(ratio, count)
+    return np.where(count <= 0, 0, partial)
+
+
+def savings_window(monthly_income, monthly_expenses, inflation_factor, months):
+    """
+    Determine the first and last month (inclusive) with positive savings.
+
+    Expenses change monotonically, so the months in which income exceeds
+    expenses (and savings are not clamped to zero) form a single window: at
+    the start for inflation, at the end for deflation.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        crossing = np.log(monthly_income / monthly_expenses) / np.log(inflation_factor)
+    first = np.where(inflation_factor < 1, np.floor(crossing) + 1, 1)
+    last = np.where(inflation_factor > 1, np.ceil(crossing) - 1, months)
+    last = np.where(
+        (inflation_factor == 1) & (monthly_income <= monthly_expenses), 0, last
+    )
+    first = np.where(inflation_factor == 0, 1, first)
+    return np.clip(first, 1, months + 1), np.clip(last, 0, months)
+
+
+def solve(
+    initial_portfolio,
+    monthly_income,
+    monthly_expenses,
+    inflation_factor,
+    return_factor,
+    safe_rate,
+    months=MONTHS,
+):
+    """
+    Determine the retirement month without simulating month by month.
+
+    The portfolio after month m is the closed-form sum
+
+        P[m] = r ** m * P[0] + sum(r ** (m - k) * (I - E * i ** k))
+
+    over the months k <= m with positive savings, which splits into two
+    geometric series. This is evaluated for every month in one array
+    operation, so the first month above the target portfolio is found
+    even when the portfolio crosses the target more than once.
+
+    The sums differ from stepping through the months in the last bits, so
+    the retirement details are then recalculated exactly (see replay).
+
+    Arguments are scalars or 1D arrays, see simulate().
+    """
+    (
+        initial_portfolio,
+        monthly_income,
+        monthly_expenses,
+        inflation_factor,
+        return_factor,
+        safe_rate,
+    ) = (
+        np.asarray(value, dtype=float).reshape(-1, 1)
+        for value in np.broadcast_arrays(
+            initial_portfolio,
+            monthly_income,
+            monthly_expenses,
+            inflation_factor,
+            return_factor,
+            safe_rate,
+        )
+    )
+    month = np.arange(1, months + 1)
+    first, last = savings_window(
+        monthly_income, monthly_expenses, inflation_factor, months
+    )
+
+    # Savings from month `first` up to this month (or `last`, if earlier)
+    until = np.minimum(last, month)
+    count = np.maximum(until - first + 1, 0)
+    # NOTE: Powers and geometric sums only depend on the rates and a number
+    #       of months, so they are tabulated for scenarios which share rates.
+    with np.errstate(over="ignore", invalid="ignore"):
+        savings = rates.tabulate(np.power, [return_factor], month - until) * (
+            monthly_income * rates.tabulate(power_sum, [return_factor, 1.0], count)
+            - monthly_expenses
+            * inflation_factor ** first
+            * rates.tabulate(power_sum, [return_factor, inflation_factor], count)
+        )
+        portfolio = rates.tabulate(
+            np.power, [return_factor], month
+        ) * initial_portfolio + np.where(count > 0, savings, 0)
+    expenses = monthly_expenses * rates.tabulate(np.power, [inflation_factor], month)
+    target = expenses * 12 / safe_rate
+
+    reached = portfolio > target
+    found = reached.any(axis=1)
+    return replay(
+        np.where(found, reached.argmax(axis=1) + 1, 0),
+        initial_portfolio.ravel(),
+        monthly_income.ravel(),
+        monthly_expenses.ravel(),
+        inflation_factor.ravel(),
+        return_factor.ravel(),
+        safe_rate.ravel(),
+        months,
+    )
+
+
+def replay(
+    retirement_month,
+    initial_portfolio,
+    monthly_income,
+    monthly_expenses,
+    inflation_factor,
+    return_factor,
+    safe_rate,
+    months=MONTHS,
+):
+    """
+    Recalculate the retirement details of the scenarios that retire (those
+    with a retirement month), stepping through the months with the same
+    floating point operations as Calculator.
+
+    Only the months up to retirement are calculated, one scenario at a time
+    in Python (faster than arrays of a few scenarios). A scenario which
+    retires in a (slightly) different month than expected gets the month
+    of Calculator. Arguments are 1D arrays.
+    """
+    retirement_month = np.array(retirement_month)
+    portfolio = np.full(len(retirement_month), np.nan)
+    expenses = np.full(len(retirement_month), np.nan)
+    for index in np.flatnonzero(retirement_month).tolist():
+        current = float(initial_portfolio[index])
+        income = float(monthly_income[index])
+        spent = float(monthly_expenses[index])
+        inflation = float(inflation_factor[index])
+        growth = float(return_factor[index])
+        rate = float(safe_rate[index])
+        for month in range(1, months + 1):
+            spent *= inflation
+            current = current * growth + max(income - spent, 0)
+            if current > spent * 12 / rate:
+                retirement_month[index] = month
+                portfolio[index] = current
+                expenses[index] = spent
+                break
+        else:
+            retirement_month[index] = 0
+    return Summary(
+        retirement_month=retirement_month, portfolio=portfolio, expenses=expenses
+    )
+
+
+def march(
+    initial_portfolio,
+    monthly_income,
+    monthly_expenses,
+    inflation_factor,
+    return_factor,
+    safe_rate,
+    months=MONTHS,
+):
+    """
+    Determine the retirement month by stepping through the months, for all
+    scenarios at once.
+
+    Instead of arrays of (scenarios, months), only the current month of every
+    scenario is kept, and scenarios are dropped as soon as they retire. This
+    keeps memory linear in the number of scenarios, which makes it the best
+    fit for large grids. Every scenario goes through the same floating point
+    operations as Calculator, so results are identical.
+
+    Arguments are scalars or arrays of any shape (broadcast against each
+    other), the arrays of the returned Summary have the broadcast shape.
+    """
+    shape = np.broadcast(
+        initial_portfolio,
+        monthly_income,
+        monthly_expenses,
+        inflation_factor,
+        return_factor,
+        safe_rate,
+    ).shape
+    (
+        portfolio,
+        monthly_income,
+        expenses,
+        inflation_factor,
+        return_factor,
+        safe_rate,
+    ) = (
+        np.broadcast_to(np.asarray(value, dtype=float), shape).flatten()
+        for value in (
+            initial_portfolio,
+            monthly_income,
+            monthly_expenses,
+            inflation_factor,
+            return_factor,
+            safe_rate,
+        )
+    )
+
+    retirement_month = np.zeros(portfolio.size, dtype=int)
+    retirement_portfolio = np.full(portfolio.size, np.nan)
+    retirement_expenses = np.full(portfolio.size, np.nan)
+    scenarios = np.arange(portfolio.size)
+
+    for month in range(1, months + 1):
+        if not scenarios.size:
+            break
+
+        # NOTE: Operations are done in place, this loop is the hot path.
+        np.multiply(expenses, inflation_factor, out=expenses)
+        savings = np.subtract(monthly_income, expenses)
+        np.maximum(savings, 0, out=savings)
+        np.multiply(portfolio, return_factor, out=portfolio)
+        np.add(portfolio, savings, out=portfolio)
+        target = np.multiply(expenses, 12, out=savings)
+        np.divide(target, safe_rate, out=target)
+        reached = portfolio > target
+
+        # NOTE: Once expenses exceed income under inflation, savings stay
+        #       zero, and if returns don't outgrow inflation either the
+        #       portfolio can never catch up with the target again. Those
+        #       scenarios are dropped early (with a margin far larger than
+        #       any rounding difference), as they will never retire.
+        hopeless = None
+        if month % 12 == 0:
+            hopeless = (
+                (monthly_income <= expenses)
+                & (inflation_factor >= 1)
+                & (return_factor <= inflation_factor)
+                & (portfolio < target * (1 - 1e-9))
+            )
+            if not hopeless.any():
+                hopeless = None
+
+        if hopeless is None and not reached.any():
+            continue
+
+        # Record the retired scenarios, and continue with the others only
+        retired = scenarios[reached]
+        retirement_month[retired] = month
+        retirement_portfolio[retired] = portfolio[reached]
+        retirement_expenses[retired] = expenses[reached]
+        remaining = ~reached if hopeless is None else ~(reached | hopeless)
+        scenarios = scenarios[remaining]
+        portfolio = portfolio[remaining]
+        expenses = expenses[remaining]
+        monthly_income = monthly_income[remaining]
+        inflation_factor = inflation_factor[remaining]
+        return_factor = return_factor[remaining]
+        safe_rate = safe_rate[remaining]
+
+    return Summary(
+        retirement_month=retirement_month.reshape(shape),
+        portfolio=retirement_portfolio.reshape(shape),
+        expenses=retirement_expenses.reshape(shape),
+    )